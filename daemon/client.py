@@ -0,0 +1,48 @@
+import os
+import json
+import socket
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOCKET_PATH = os.path.join(BASE_DIR, "config", "stalkr.sock")
+CLIENT_TIMEOUT = 900  # seconds; a full validate pass on a large tab can take minutes
+
+class DaemonError(Exception):
+    """Raised when the daemon answers a request with an error."""
+
+def daemon_available():
+    return hasattr(socket, "AF_UNIX") and os.path.exists(SOCKET_PATH)
+
+def send_request(op, timeout=CLIENT_TIMEOUT, **params):
+    """Send one request to the daemon and return its result dict."""
+    started = time.perf_counter()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(SOCKET_PATH)
+        sock.sendall((json.dumps({"op": op, "params": params}) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise DaemonError(f"Daemon closed the connection without answering '{op}'.")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise DaemonError(response.get("error", "unknown daemon error"))
+    result = response.get("result") or {}
+    result["round_trip_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+def request_if_running(op, **params):
+    """Run `op` on the daemon if one is listening, else return None so the caller runs locally."""
+    if not daemon_available():
+        return None
+    try:
+        return send_request(op, **params)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # Stale socket file left by a daemon that did not shut down cleanly.
+        return None
+
+def print_daemon_result(result):
+    print(f"⚡ Handled by stalkr daemon ({result.get('round_trip_ms')} ms round trip)")
+    for key, value in result.items():
+        if key != "round_trip_ms":
+            print(f"  {key}: {value}")
@@ -0,0 +1,330 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import socket
+import socketserver
+import threading
+import time
+from daemon.client import SOCKET_PATH, send_request
+from utils.jd_connection_utils import check_jd_api_connection, load_user_config
+from utils.logger import logprint, log_script
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
+ORG_SECRETS_PATH = os.path.join(BASE_DIR, "config", "org_secrets.json")
+SNAPSHOT_TTL = 30  # seconds a sheet snapshot is reused before re-reading the tab
+
+class StalkrDaemon:
+    """Keeps the Sheets client, worksheet snapshot and JD device warm between requests."""
+
+    def __init__(self, snapshot_ttl=SNAPSHOT_TTL):
+        self.snapshot_ttl = snapshot_ttl
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests_served = 0
+        self.busy_with = None
+        self.cfg = None
+        self.cfg_mtime = None
+        self.api_key = None
+        self.reset()
+
+    def reset(self):
+        """Drop warm clients so the next request reconnects from scratch."""
+        if getattr(self, "write_buffer", None) is not None:
+            self.write_buffer.close()
+        self.write_buffer = None
+        self.spreadsheet = None
+        self.worksheet = None
+        self.rows = None
+        self.rows_fetched_at = None
+        self.device = None
+        self.pool = None
+        self.org_devices = None
+        self.progress = None
+
+    def load_config(self):
+        mtime = os.path.getmtime(USER_CONFIG_PATH)
+        if self.cfg is not None and mtime == self.cfg_mtime:
+            return self.cfg
+        cfg = load_user_config(USER_CONFIG_PATH)
+        if self.cfg is not None and (
+            cfg.get("sheet_url") != self.cfg.get("sheet_url")
+            or cfg.get("last_tab") != self.cfg.get("last_tab")
+            or cfg.get("device") != self.cfg.get("device")
+        ):
+            self.reset()
+        self.cfg = cfg
+        self.cfg_mtime = mtime
+        return cfg
+
+    def get_worksheet(self):
+        from downloader.download_videos import open_job_worksheet
+        if self.worksheet is None:
+            self.spreadsheet, self.worksheet, self.rows = open_job_worksheet(self.load_config())
+            self.rows_fetched_at = time.time()
+        return self.worksheet
+
+    def get_write_buffer(self):
+        from sheet.sheet_tools import open_write_buffer
+        if self.write_buffer is None:
+            self.write_buffer = open_write_buffer(self.get_sheet_data())
+        return self.write_buffer
+
+    def get_rows(self, refresh=False):
+        worksheet = self.get_worksheet()
+        stale = self.rows_fetched_at is None or time.time() - self.rows_fetched_at > self.snapshot_ttl
+        if refresh or stale:
+            from sheet.sheet_replica import replica_for
+            replica = replica_for(worksheet)
+            replica.sync(worksheet)
+            self.rows = replica.rows()
+            self.rows_fetched_at = time.time()
+        return self.rows
+
+    def get_sheet_data(self, refresh=False):
+        """Return the (worksheet, header, col_map, rows) tuple used by sheet_tools."""
+        rows = self.get_rows(refresh)
+        header = rows[0]
+        col_map = {key: idx for idx, key in enumerate(header)}
+        return self.worksheet, header, col_map, rows
+
+    def get_device(self):
+        if self.device is None:
+            ok, device = check_jd_api_connection(self.load_config(), ORG_SECRETS_PATH)
+            if not ok or not device:
+                raise RuntimeError(f"Could not connect to MyJDownloader device '{self.cfg.get('device')}'.")
+            self.device = device
+        return self.device
+
+    def get_pool(self):
+        """Org-wide device pool for balanced dispatch; loads are re-measured on every call."""
+        from downloader.jd_dispatch import open_device_pool
+        if self.pool is None:
+            self.pool = open_device_pool(self.load_config(), ORG_SECRETS_PATH)
+            if self.pool is None:
+                raise RuntimeError("No MyJDownloader device in the org account is reachable.")
+        else:
+            self.pool.measure()
+        return self.pool
+
+    def get_org_devices(self):
+        """Every org device (own first), connected once; unlike get_pool() nothing is measured."""
+        from utils.jd_connection_utils import connect_org_devices
+        if self.pool is not None:
+            return self.pool.devices
+        if self.org_devices is None:
+            self.org_devices = connect_org_devices(self.load_config(), ORG_SECRETS_PATH)
+            if not self.org_devices:
+                self.org_devices = None
+                raise RuntimeError("No MyJDownloader device in the org account is reachable.")
+        return self.org_devices
+
+    def get_api_key(self):
+        from sheet.sheet_metadata_validator import load_org_secrets
+        if self.api_key is None:
+            secrets = load_org_secrets()
+            if not secrets or not secrets.get("youtube_api_key"):
+                raise RuntimeError("No youtube_api_key in org_secrets.json.")
+            self.api_key = secrets["youtube_api_key"]
+        return self.api_key
+
+    # --- Operations ---
+
+    def op_status(self, params):
+        return {
+            "uptime_s": round(time.time() - self.started_at),
+            "requests_served": self.requests_served,
+            "busy_with": self.busy_with,
+            "tab": (self.cfg or {}).get("last_tab"),
+            "sheet_open": self.worksheet is not None,
+            "snapshot_rows": len(self.rows) - 1 if self.rows else 0,
+            "snapshot_age_s": round(time.time() - self.rows_fetched_at, 1) if self.rows_fetched_at else None,
+            "device": self.device.name if self.device else None,
+            "pool_devices": [d.name for d in self.pool.devices] if self.pool else None,
+            "queued_sheet_writes": len(self.write_buffer.pending) if self.write_buffer else 0
+        }
+
+    def scoped(self, rows, params, done_statuses):
+        """Apply the researcher scope to the warm snapshot (no extra Sheet reads)."""
+        from sheet.sheet_scope import scope_rows
+        if not params.get("scoped", True):
+            return rows
+        return scope_rows(rows, self.load_config()["initials"], done_statuses)
+
+    def op_validate(self, params):
+        from sheet.sheet_metadata_validator import validate_rows
+        from sheet.sheet_checkpoint import RunCheckpoint
+        from sheet.sheet_scope import VALIDATE_DONE
+        rows = self.get_rows(refresh=True)
+        url_col = rows[0].index("URL") if "URL" in rows[0] else None
+        all_urls = [row[url_col] if url_col < len(row) else "" for row in rows[1:]] if url_col is not None else None
+        checkpoint = RunCheckpoint("validate", self.worksheet.spreadsheet_id, self.worksheet.title).start(params.get("resume", False))
+        try:
+            return validate_rows(
+                self.worksheet, self.scoped(rows, params, VALIDATE_DONE), self.get_api_key(),
+                all_urls=all_urls, checkpoint=checkpoint
+            )
+        finally:
+            self.rows_fetched_at = None  # validation rewrites cells, so re-read next time
+
+    def op_dispatch(self, params):
+        from downloader.download_videos import dispatch_rows, extract_job_number
+        from downloader.jd_dispatch import dispatch_mode
+        from sheet.sheet_checkpoint import RunCheckpoint
+        from sheet.sheet_scope import DOWNLOAD_DONE
+        rows = self.get_rows(refresh=params.get("refresh", True))
+        job_number = extract_job_number(self.spreadsheet.title) or "0000"
+        balance = params.get("balance")
+        if balance is None:
+            balance = dispatch_mode(self.load_config()) == "balanced"
+        checkpoint = RunCheckpoint("download", self.worksheet.spreadsheet_id, self.worksheet.title).start(params.get("resume", False))
+        write_buffer = self.get_write_buffer()
+        result = dispatch_rows(
+            self.load_config(), self.get_device(), self.scoped(rows, params, DOWNLOAD_DONE), job_number,
+            write_buffer=write_buffer,
+            pool=self.get_pool() if balance else None,
+            checkpoint=checkpoint
+        )
+        write_buffer.flush()
+        checkpoint.finish(write_buffer)
+        return result
+
+    def op_rename(self, params):
+        from downloader.watch_and_rename import rename_finished_packages
+        from sheet.sheet_scope import RENAME_DONE
+        worksheet, header, col_map, rows = self.get_sheet_data(refresh=params.get("refresh", False))
+        sheet_data = (worksheet, header, col_map, self.scoped(rows, params, RENAME_DONE))
+        try:
+            devices = self.get_org_devices()  # packages may have been sent to any org device
+        except RuntimeError:
+            devices = self.get_device()
+        return rename_finished_packages(
+            self.load_config(), devices,
+            sheet_data=sheet_data,
+            write_buffer=self.get_write_buffer()
+        )
+
+    def op_progress(self, params):
+        """Poll JD once; the monitor stays warm so each call only reports what changed."""
+        from downloader.jd_progress import ProgressMonitor, ProgressSheetWriter
+        from sheet.sheet_scope import RENAME_DONE
+        worksheet, header, col_map, rows = self.get_sheet_data()
+        sheet_data = (worksheet, header, col_map, self.scoped(rows, params, RENAME_DONE))
+        if self.progress is None:
+            self.progress = (
+                ProgressMonitor(self.get_device()),
+                ProgressSheetWriter(sheet_data, self.get_write_buffer())
+            )
+        else:
+            self.progress[1].load_rows(sheet_data)  # pick up rows dispatched or renamed since the last poll
+        monitor, writer = self.progress
+        result = monitor.poll()
+        aggregate = result["aggregate"]
+        aggregate["changed"] = len(result["changed"])
+        aggregate["rows_queued"] = writer.write(result["changed"])
+        return aggregate
+
+    def handle(self, request):
+        op = request.get("op")
+        handler = getattr(self, f"op_{op}", None)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown operation: {op}"}
+        if op == "status":
+            # Answer status without waiting for a long-running operation.
+            return {"ok": True, "result": handler(request.get("params") or {})}
+        with self.lock:
+            self.busy_with = op
+            try:
+                result = handler(request.get("params") or {})
+                self.requests_served += 1
+                return {"ok": True, "result": result}
+            except Exception as e:
+                logprint(
+                    f"❌ Daemon operation '{op}' failed: {e}",
+                    action="daemon_op_failed",
+                    status="error",
+                    error_message=str(e),
+                    extra_info={"op": op}
+                )
+                self.reset()
+                if self.cfg and self.cfg.get("sheet_url"):
+                    from sheet.sheet_cache import invalidate_sheet_metadata
+                    invalidate_sheet_metadata(self.cfg["sheet_url"])
+                return {"ok": False, "error": str(e)}
+            finally:
+                self.busy_with = None
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"ok": False, "error": f"Bad request: {e}"}
+        else:
+            if request.get("op") == "shutdown":
+                response = {"ok": True, "result": {"stopping": True}}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                response = self.server.stalkr.handle(request)
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def socket_in_use():
+    """True if another daemon is already answering on SOCKET_PATH."""
+    if not os.path.exists(SOCKET_PATH):
+        return False
+    try:
+        send_request("status", timeout=2)
+        return True
+    except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+        os.remove(SOCKET_PATH)
+        return False
+
+def warm_up(stalkr):
+    """Open the sheet and connect the JD device up front so the first request is fast."""
+    try:
+        stalkr.get_rows()
+        print(f"✅ Sheet snapshot loaded: {len(stalkr.rows) - 1} rows")
+    except Exception as e:
+        print(f"⚠️ Could not open the Sheet yet: {e}")
+    try:
+        stalkr.get_device()
+    except Exception as e:
+        print(f"⚠️ Could not connect to JDownloader yet: {e}")
+
+@log_script
+def serve():
+    if not hasattr(socket, "AF_UNIX"):
+        logprint("❌ The stalkr daemon needs Unix domain sockets (macOS/Linux).", action="daemon_unsupported", status="error")
+        return
+    if socket_in_use():
+        logprint(f"ℹ️ A stalkr daemon is already running on {SOCKET_PATH}", action="daemon_already_running", status="info")
+        return
+
+    stalkr = StalkrDaemon()
+    stalkr.load_config()
+    warm_up(stalkr)
+
+    server = _UnixServer(SOCKET_PATH, _RequestHandler)
+    server.stalkr = stalkr
+    os.chmod(SOCKET_PATH, 0o600)
+    logprint(f"🟢 stalkr daemon listening on {SOCKET_PATH} (Ctrl+C to stop)", action="daemon_start", status="info")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stalkr.reset()  # flushes queued Sheet writes
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)
+        logprint("🛑 stalkr daemon stopped.", action="daemon_stop", status="info")
+
+if __name__ == "__main__":
+    serve()
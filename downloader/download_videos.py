@@ -3,10 +3,15 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import json
 import re
-import gspread
 from utils.logger import log_event
+from utils.profiler import profiled
+from daemon.client import request_if_running, print_daemon_result
 
-from google.oauth2.service_account import Credentials
+from sheet.sheet_cache import authorize
+from sheet.sheet_checkpoint import RunCheckpoint
+from sheet.sheet_scope import read_tab_rows, DOWNLOAD_DONE
+from sheet.sheet_tools import open_write_buffer
+from downloader.jd_dispatch import dispatch_mode, open_device_pool
 from utils.filename_generator import generate_ifl_filename
 from utils.jd_connection_utils import (
     ensure_jd_running_and_connected,
@@ -17,6 +22,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
 SERVICE_ACCOUNT_PATH = os.path.join(BASE_DIR, "private", "stalkrorgsheetapi-4feb1ec20bbe.json")
 ORG_SECRETS_PATH = os.path.join(BASE_DIR, "config", "org_secrets.json")
+DOWNLOAD_COLUMNS = ["URL", "Title", "User"]
 
 # --- Extract YouTube ID ---
 def extract_youtube_id(url):
@@ -28,42 +34,48 @@ def extract_job_number(sheet_title):
     match = re.match(r'([0-9]{4,})(?:L)?', sheet_title)
     return match.group(1) if match else None
 
-def main():
-    # --- Script start log
-    log_event(
-        script="download_videos.py",
-        action="script_start",
-        status="info"
+def open_job_worksheet(cfg, scoped=False):
+    """Return (spreadsheet, worksheet, rows) for the configured Sheet and tab.
+
+    With `scoped`, only this researcher's rows that are not yet queued are read (others are None).
+    """
+    client = authorize(
+        SERVICE_ACCOUNT_PATH,
+        ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    )
+    sheet, worksheet, rows, _ = read_tab_rows(
+        client, cfg["sheet_url"], cfg["last_tab"],
+        initials=cfg.get("initials") if scoped else None,
+        columns=DOWNLOAD_COLUMNS,
+        done_statuses=DOWNLOAD_DONE
     )
+    if sheet is None:
+        raise RuntimeError("Sheet is unreachable and its metadata is not cached; cannot dispatch offline.")
+    return sheet, worksheet, rows
 
-    cfg = load_user_config(USER_CONFIG_PATH)
-    try:
-        creds = Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_PATH,
-            scopes=["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        )
-        client = gspread.authorize(creds)
-        sheet = client.open_by_url(cfg["sheet_url"])
-        worksheet = sheet.worksheet(cfg["last_tab"])
-        job_number = extract_job_number(sheet.title) or "0000"
-        rows = worksheet.get_all_values()
-        header = rows[0]
-        data_rows = rows[1:]
-        col_map = {key: idx for idx, key in enumerate(header)}
+def dispatch_rows(cfg, device, rows, job_number, write_buffer=None, pool=None, checkpoint=None):
+    """Send every row with a YouTube URL and title to JDownloader. Returns summary counts.
 
-        # Use the JD utility for connection
-        ok, device = ensure_jd_running_and_connected(cfg, USER_CONFIG_PATH, ORG_SECRETS_PATH)
-        if not ok or not device:
-            print("❌ JD device not found.")
-            log_event(
-                script="download_videos.py",
-                action="jd_device_not_found",
-                status="error",
-                error_message="JD device not found"
-            )
-            return
+    Rows that are None (outside a scoped read) are ignored. With a `write_buffer`, sent rows
+    are marked "Queued" in the Status column. With a `pool` (jd_dispatch.DevicePool), each
+    package goes to the least-loaded org device instead of `device`. With a `checkpoint`
+    (sheet_checkpoint.RunCheckpoint), rows sent by an interrupted run are not sent again.
+    """
+    header = rows[0]
+    data_rows = rows[1:]
+    col_map = {key: idx for idx, key in enumerate(header)}
+    sent = 0
+    skipped = 0
+    failed = 0
+    resumed = 0
+    per_device = {}
+    if checkpoint is not None and write_buffer is not None:
+        checkpoint.restore_pending(write_buffer, rows)
 
+    try:
         for i, row in enumerate(data_rows):
+            if row is None:
+                continue
             url = row[col_map.get("URL", -1)]
             title = row[col_map.get("Title", -1)]
             channel = row[col_map.get("User", -1)]
@@ -76,6 +88,10 @@ def main():
                     sheet_row=i+2,
                     extra_info={"url": url, "title": title}
                 )
+                skipped += 1
+                continue
+            if checkpoint is not None and checkpoint.take_resumed(yt_id):
+                resumed += 1
                 continue
             filename = generate_ifl_filename(
                 youtube_id=yt_id,
@@ -85,13 +101,15 @@ def main():
                 researcher_initials=cfg["initials"],
                 description="DESCRIPTION"
             )
-            print(f"📤 Sending {url} as {filename}")
             try:
-                device.linkgrabber.add_links([{
+                target = pool.pick() if pool else device
+                folder = pool.destination(target) if pool else cfg["download_dir"]
+                print(f"📤 Sending {url} as {filename}" + (f" to {target.name}" if pool else ""))
+                target.linkgrabber.add_links([{
                     "autostart": True,
                     "links": url,
                     "packageName": filename,
-                    "destinationFolder": cfg["download_dir"]
+                    "destinationFolder": folder
                 }])
                 log_event(
                     script="download_videos.py",
@@ -99,8 +117,15 @@ def main():
                     filename=filename,
                     status="success",
                     sheet_row=i+2,
-                    extra_info={"url": url}
+                    extra_info={"url": url, "device": target.name}
                 )
+                sent += 1
+                per_device[target.name] = per_device.get(target.name, 0) + 1
+                if write_buffer is not None:
+                    write_buffer.set(i+2, "Status", "Queued")
+                if checkpoint is not None:
+                    checkpoint.mark_done(i+2, yt_id)
+                    checkpoint.maybe_save(write_buffer)
             except Exception as e:
                 log_event(
                     script="download_videos.py",
@@ -112,6 +137,106 @@ def main():
                     extra_info={"url": url}
                 )
                 print(f"❌ Failed to send download for {filename}: {e}")
+                failed += 1
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.save(write_buffer)
+            print("💾 Progress saved; run again with --resume to continue.")
+        raise
+
+    result = {"sent": sent, "skipped": skipped, "failed": failed}
+    if resumed:
+        result["resumed"] = resumed
+        print(f"⏭️ Skipped {resumed} row(s) sent before the interruption.")
+    if pool:
+        result["per_device"] = per_device
+    return result
+
+def schedule_rows(cfg, device, rows, job_number, write_buffer=None, pool=None, scoped=True, refill_interval=None):
+    """Feed rows through the priority scheduler instead of sending them all at once.
+
+    Blocks until every scheduled package has finished; the Sheet is re-read every
+    `refill_interval` seconds (default: cfg "refill_interval_s") so newly added (e.g. urgent)
+    rows join the queue.
+    """
+    from downloader.jd_scheduler import DownloadScheduler, jobs_from_rows
+    scheduler = DownloadScheduler(cfg, device, pool=pool, write_buffer=write_buffer, refill_interval=refill_interval)
+    for job in jobs_from_rows(cfg, rows, job_number):
+        scheduler.push(job)
+    print(
+        f"🗂️ {len(scheduler.queue)} package(s) scheduled: at most {scheduler.max_in_flight} in flight"
+        + (f", {scheduler.max_bandwidth / (1024 * 1024):.0f} MB/s" if scheduler.max_bandwidth else "")
+    )
+
+    def refill():
+        _, _, fresh_rows = open_job_worksheet(cfg, scoped=scoped)
+        return jobs_from_rows(cfg, fresh_rows, job_number)
+
+    try:
+        return scheduler.run(refill=refill)
+    except KeyboardInterrupt:
+        print(f"🛑 Scheduler stopped; {len(scheduler.queue)} package(s) were not released.")
+        return scheduler.stats()
+
+@profiled
+def main(scoped=True, balance=None, schedule=False, resume=False, refill_interval=None):
+    # --- Script start log
+    log_event(
+        script="download_videos.py",
+        action="script_start",
+        status="info"
+    )
+
+    # The scheduler runs until the downloads finish, so it always runs in this process.
+    daemon_result = None if schedule else request_if_running("dispatch", scoped=scoped, balance=balance, resume=resume)
+    if daemon_result is not None:
+        print_daemon_result(daemon_result)
+        log_event(
+            script="download_videos.py",
+            action="script_end",
+            status="success"
+        )
+        return
+
+    cfg = load_user_config(USER_CONFIG_PATH)
+    if balance is None:
+        balance = dispatch_mode(cfg) == "balanced"
+    try:
+        sheet, worksheet, rows = open_job_worksheet(cfg, scoped=scoped)
+        job_number = extract_job_number(sheet.title) or "0000"
+
+        # Use the JD utility for connection
+        ok, device = ensure_jd_running_and_connected(cfg, USER_CONFIG_PATH, ORG_SECRETS_PATH)
+        if not ok or not device:
+            print("❌ JD device not found.")
+            log_event(
+                script="download_videos.py",
+                action="jd_device_not_found",
+                status="error",
+                error_message="JD device not found"
+            )
+            return
+
+        pool = open_device_pool(cfg, ORG_SECRETS_PATH) if balance else None
+        if balance and pool is None:
+            print(f"⚠️ Load balancing unavailable; sending everything to {device.name}.")
+
+        write_buffer = open_write_buffer((worksheet, rows[0]))
+        checkpoint = None if schedule else RunCheckpoint("download", worksheet.spreadsheet_id, worksheet.title).start(resume)
+        try:
+            if schedule:
+                result = schedule_rows(
+                    cfg, device, rows, job_number, write_buffer=write_buffer, pool=pool, scoped=scoped,
+                    refill_interval=refill_interval
+                )
+            else:
+                result = dispatch_rows(cfg, device, rows, job_number, write_buffer=write_buffer, pool=pool, checkpoint=checkpoint)
+            if result.get("per_device"):
+                print("📦 Packages per device: " + ", ".join(f"{name}: {n}" for name, n in result["per_device"].items()))
+        finally:
+            write_buffer.close()
+        if checkpoint is not None:
+            checkpoint.finish(write_buffer)
 
         log_event(
             script="download_videos.py",
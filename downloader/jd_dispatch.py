@@ -0,0 +1,100 @@
+"""Load-balanced dispatch across every JDownloader device in the org account.
+
+Each device is scored by how long its current queue would take to drain: remaining
+bytes (unsized packages count as AVG_PACKAGE_BYTES) divided by its recent throughput,
+measured with a ProgressMonitor. Packages go to the device with the lowest score, and
+each assignment adds AVG_PACKAGE_BYTES to that device's queue so a batch spreads out.
+
+cfg["dispatch_affinity"] (0-1) biases towards the researcher's own device: its score is
+multiplied by (1 - affinity), so 0 is pure balancing and 1 keeps everything local.
+cfg["device_dirs"] maps device names to their download folder (default: download_dir).
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from downloader.jd_progress import ProgressMonitor, format_bytes, format_eta
+from utils.jd_connection_utils import connect_org_devices
+from utils.logger import logprint
+
+AVG_PACKAGE_BYTES = 500 * 1024 * 1024  # size assumed for packages JD has not sized yet
+IDLE_THROUGHPUT = 2 * 1024 * 1024  # bytes/s assumed for a device with no measured throughput
+DEFAULT_AFFINITY = 0.5
+
+def dispatch_mode(cfg):
+    return cfg.get("dispatch_mode", "single")
+
+class DevicePool:
+    """The org's devices with their measured load; pick() returns where the next package goes."""
+
+    def __init__(self, cfg, devices):
+        self.cfg = cfg
+        self.devices = list(devices)
+        self.own = cfg.get("device")
+        self.affinity = min(max(float(cfg.get("dispatch_affinity", DEFAULT_AFFINITY)), 0.0), 1.0)
+        self.monitors = {d.device_id: ProgressMonitor(d) for d in self.devices}
+        self.loads = {}
+
+    def measure(self):
+        """Poll every device once. Devices that do not answer are left out of this round."""
+        self.loads = {}
+        for device in self.devices:
+            try:
+                aggregate = self.monitors[device.device_id].poll()["aggregate"]
+            except Exception as e:
+                print(f"⚠️ Device '{device.name}' did not answer ({e}); not dispatching to it.")
+                continue
+            monitor = self.monitors[device.device_id]
+            unsized = sum(1 for p in monitor.packages.values() if p["state"] != "finished" and not p["bytes_total"])
+            self.loads[device.device_id] = {
+                "device": device,
+                "queued": aggregate["active"],
+                "remaining": aggregate["bytes_total"] - aggregate["bytes_loaded"] + unsized * AVG_PACKAGE_BYTES,
+                "throughput": aggregate["throughput"],
+                "assigned": 0
+            }
+        return self.loads
+
+    def score(self, load):
+        """Seconds until the device's queue (plus this run's assignments) drains, weighted by affinity."""
+        throughput = load["throughput"] or IDLE_THROUGHPUT
+        seconds = (load["remaining"] + load["assigned"] * AVG_PACKAGE_BYTES) / throughput
+        if load["device"].name == self.own:
+            seconds *= 1 - self.affinity
+        return seconds
+
+    def pick(self):
+        if not self.loads:
+            self.measure()
+        if not self.loads:
+            raise RuntimeError("No MyJDownloader device in the org account is reachable.")
+        # min() keeps the first of equal scores; the own device is listed first.
+        load = min(self.loads.values(), key=self.score)
+        load["assigned"] += 1
+        return load["device"]
+
+    def destination(self, device):
+        return self.cfg.get("device_dirs", {}).get(device.name, self.cfg["download_dir"])
+
+    def print_loads(self):
+        for load in self.loads.values():
+            print(
+                f"🖥️ {load['device'].name}: {load['queued']} queued, {format_bytes(load['remaining'])} left, "
+                f"{format_bytes(load['throughput'])}/s, drains in {format_eta(self.score(load))}"
+                f"{' (own)' if load['device'].name == self.own else ''}"
+            )
+
+    def assignments(self):
+        return {load["device"].name: load["assigned"] for load in self.loads.values() if load["assigned"]}
+
+def open_device_pool(cfg, org_secrets_path):
+    """Connect to all org devices and measure their load. Returns None if none are reachable."""
+    devices = connect_org_devices(cfg, org_secrets_path)
+    if not devices:
+        return None
+    pool = DevicePool(cfg, devices)
+    pool.measure()
+    pool.print_loads()
+    if not pool.loads:
+        logprint("❌ No MyJDownloader device answered.", action="jd_pool_empty", status="error")
+        return None
+    return pool
@@ -0,0 +1,289 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import re
+import time
+from collections import deque
+from sheet.sheet_tools import get_sheet, open_write_buffer
+from sheet.sheet_scope import is_done, RENAME_DONE
+from utils.jd_connection_utils import (
+    ensure_jd_running_and_connected,
+    load_user_config
+)
+from utils.logger import logprint, log_script
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
+ORG_SECRETS_PATH = os.path.join(BASE_DIR, "config", "org_secrets.json")
+SERVICE_ACCOUNT_PATH = os.path.join(BASE_DIR, "private", "stalkrorgsheetapi-4feb1ec20bbe.json")
+
+POLL_INTERVAL = 15  # seconds between JD polls
+STALL_AFTER = 120  # seconds without new bytes before a running package counts as stalled
+THROUGHPUT_WINDOW = 60  # seconds of samples used for throughput
+SHEET_UPDATE_INTERVAL = 60  # min seconds between progress writes for the same row
+SHEET_REFRESH_POLLS = 4  # re-read the Sheet every this many polls, to map newly dispatched rows
+
+# Only the fields the monitor uses (name and uuid are always returned).
+PROGRESS_QUERY = [{
+    "bytesLoaded": True,
+    "bytesTotal": True,
+    "finished": True,
+    "running": True,
+    "speed": True,
+    "status": True,
+    "maxResults": -1,
+    "startAt": 0,
+    "packageUUIDs": []
+}]
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+def format_eta(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02}s"
+    return f"{seconds}s"
+
+class ProgressMonitor:
+    """Polls JD packages and reports only what changed since the previous poll.
+
+    Throughput is measured from bytesLoaded deltas over THROUGHPUT_WINDOW (falling back to
+    JD's own speed), ETA is remaining bytes / throughput, and a running package whose
+    bytesLoaded has not moved for `stall_after` seconds is reported as stalled.
+    """
+
+    def __init__(self, device, stall_after=STALL_AFTER, window=THROUGHPUT_WINDOW, clock=time.time):
+        self.device = device
+        self.stall_after = stall_after
+        self.window = window
+        self.clock = clock
+        self.packages = {}  # uuid -> latest progress dict
+        self._samples = {}  # uuid -> deque of (time, bytesLoaded)
+        self._last_progress_at = {}  # uuid -> time bytesLoaded last increased
+
+    def _progress(self, pkg, now):
+        uuid = pkg.get("uuid")
+        loaded = pkg.get("bytesLoaded", 0) or 0
+        total = pkg.get("bytesTotal", 0) or 0
+        finished = bool(pkg.get("finished")) or pkg.get("status") == "Finished"
+
+        samples = self._samples.setdefault(uuid, deque())
+        if not samples or loaded != samples[-1][1]:
+            samples.append((now, loaded))
+        while len(samples) > 2 and now - samples[0][0] > self.window:
+            samples.popleft()
+        previous = self.packages.get(uuid)
+        if previous is None or loaded > previous["bytes_loaded"]:
+            self._last_progress_at[uuid] = now
+
+        if len(samples) >= 2 and now > samples[0][0]:
+            throughput = (loaded - samples[0][1]) / (now - samples[0][0])
+        else:
+            throughput = pkg.get("speed", 0) or 0
+        remaining = max(total - loaded, 0)
+        stalled = (
+            not finished
+            and bool(pkg.get("running", True))
+            and now - self._last_progress_at.get(uuid, now) >= self.stall_after
+        )
+        if finished:
+            state = "finished"
+        elif stalled:
+            state = "stalled"
+        elif loaded > 0:
+            state = "downloading"
+        else:
+            state = "waiting"
+        return {
+            "uuid": uuid,
+            "name": pkg.get("name"),
+            "state": state,
+            "bytes_loaded": loaded,
+            "bytes_total": total,
+            "percent": round(100 * loaded / total, 1) if total else 0.0,
+            "throughput": max(throughput, 0),
+            "eta": remaining / throughput if throughput > 0 and not finished else None
+        }
+
+    def poll(self):
+        """Query JD once. Returns {"changed": [...], "removed": [...], "aggregate": {...}}."""
+        now = self.clock()
+        packages = self.device.downloads.query_packages(PROGRESS_QUERY)
+        seen = set()
+        changed = []
+        for pkg in packages:
+            progress = self._progress(pkg, now)
+            uuid = progress["uuid"]
+            seen.add(uuid)
+            previous = self.packages.get(uuid)
+            if (
+                previous is None
+                or previous["state"] != progress["state"]
+                or previous["bytes_loaded"] != progress["bytes_loaded"]
+            ):
+                changed.append(progress)
+            self.packages[uuid] = progress
+        removed = [uuid for uuid in self.packages if uuid not in seen]
+        for uuid in removed:
+            self.packages.pop(uuid)
+            self._samples.pop(uuid, None)
+            self._last_progress_at.pop(uuid, None)
+        return {"changed": changed, "removed": removed, "aggregate": self.aggregate()}
+
+    def aggregate(self):
+        active = [p for p in self.packages.values() if p["state"] != "finished"]
+        loaded = sum(p["bytes_loaded"] for p in active)
+        total = sum(p["bytes_total"] for p in active)
+        throughput = sum(p["throughput"] for p in active)
+        return {
+            "packages": len(self.packages),
+            "active": len(active),
+            "stalled": sum(1 for p in active if p["state"] == "stalled"),
+            "finished": len(self.packages) - len(active),
+            "bytes_loaded": loaded,
+            "bytes_total": total,
+            "throughput": throughput,
+            "eta": (total - loaded) / throughput if throughput > 0 else None
+        }
+
+def progress_status(progress):
+    """Status cell text for a package."""
+    if progress["state"] == "finished":
+        return "Downloaded"
+    if progress["state"] == "stalled":
+        return f"Downloading {progress['percent']:.0f}% (stalled)"
+    if progress["state"] == "waiting":
+        return "Queued"
+    return (
+        f"Downloading {progress['percent']:.0f}% "
+        f"({format_bytes(progress['throughput'])}/s, ETA {format_eta(progress['eta'])})"
+    )
+
+class ProgressSheetWriter:
+    """Writes package progress to the Status column through a write-behind buffer.
+
+    A row is rewritten at most once per `min_interval` seconds unless its state changes
+    (e.g. downloading -> stalled or finished), so polling often stays cheap on quota.
+    Rows already marked "Renamed" are never rewritten, so a finished package JD still
+    lists does not downgrade them to "Downloaded".
+    """
+
+    def __init__(self, sheet_data, write_buffer, min_interval=SHEET_UPDATE_INTERVAL, clock=time.time):
+        self.write_buffer = write_buffer
+        self.min_interval = min_interval
+        self.clock = clock
+        self._last_written = {}  # row_num -> (time, state)
+        self.load_rows(sheet_data)
+
+    def load_rows(self, sheet_data):
+        """(Re)build the YouTube ID -> row map from a get_sheet tuple."""
+        from downloader.download_videos import extract_youtube_id
+        worksheet, header, col_map, rows = sheet_data
+        self.rows = rows
+        self.status_col = col_map.get("Status")
+        self.rows_by_id = {}
+        url_col = col_map.get("URL")
+        for row_num, row in enumerate(rows[1:], start=2):
+            if row is None or url_col is None or url_col >= len(row):
+                continue
+            yt_id = extract_youtube_id(row[url_col])
+            if yt_id:
+                self.rows_by_id.setdefault(yt_id, row_num)
+
+    def row_for(self, package_name):
+        match = re.search(r"_yt_([0-9A-Za-z_-]{11})_", package_name or "")
+        return self.rows_by_id.get(match.group(1)) if match else None
+
+    def is_renamed(self, row_num):
+        row = self.rows[row_num - 1]
+        if row is None or self.status_col is None or self.status_col >= len(row):
+            return False
+        return is_done(row[self.status_col], RENAME_DONE)
+
+    def write(self, changed):
+        """Queue Status updates for changed packages. Returns the number of rows queued."""
+        now = self.clock()
+        queued = 0
+        for progress in changed:
+            row_num = self.row_for(progress["name"])
+            if row_num is None or self.is_renamed(row_num):
+                continue
+            last = self._last_written.get(row_num)
+            if last and last[1] == progress["state"] and now - last[0] < self.min_interval:
+                continue
+            self.write_buffer.set(row_num, "Status", progress_status(progress))
+            self._last_written[row_num] = (now, progress["state"])
+            queued += 1
+        return queued
+
+def print_aggregate(aggregate):
+    print(
+        f"📊 {aggregate['active']} active ({aggregate['stalled']} stalled), {aggregate['finished']} finished — "
+        f"{format_bytes(aggregate['bytes_loaded'])} / {format_bytes(aggregate['bytes_total'])}, "
+        f"{format_bytes(aggregate['throughput'])}/s, ETA {format_eta(aggregate['eta'])}"
+    )
+
+def monitor_progress(cfg, device, interval=POLL_INTERVAL, once=False, scoped=True, refresh_polls=SHEET_REFRESH_POLLS):
+    """Poll JD every `interval` seconds, print progress and push it to the Sheet until Ctrl+C.
+
+    The Sheet is re-read every `refresh_polls` polls, and before writing whenever a package
+    has just finished, so new rows get mapped and rows renamed meanwhile are left alone.
+    """
+    sheet_data = get_sheet(cfg, SERVICE_ACCOUNT_PATH, scoped=scoped)
+    write_buffer = open_write_buffer(sheet_data)
+    writer = ProgressSheetWriter(sheet_data, write_buffer)
+    monitor = ProgressMonitor(device)
+    reported_stalls = set()
+    polls = 0
+    try:
+        while True:
+            result = monitor.poll()
+            polls += 1
+            just_finished = any(p["state"] == "finished" for p in result["changed"])
+            if polls > 1 and (just_finished or polls % refresh_polls == 0):
+                try:
+                    writer.load_rows(get_sheet(cfg, SERVICE_ACCOUNT_PATH, scoped=scoped))
+                except Exception as e:
+                    print(f"⚠️ Could not refresh the Sheet ({e}); using the rows read earlier.")
+            for progress in result["changed"]:
+                if progress["state"] == "stalled" and progress["uuid"] not in reported_stalls:
+                    reported_stalls.add(progress["uuid"])
+                    logprint(
+                        f"⚠️ Stalled: {progress['name']} at {progress['percent']:.0f}%",
+                        action="download_stalled",
+                        status="warning",
+                        extra_info={"package": progress["name"], "percent": progress["percent"]}
+                    )
+                elif progress["state"] != "stalled":
+                    reported_stalls.discard(progress["uuid"])
+            writer.write(result["changed"])
+            print_aggregate(result["aggregate"])
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logprint("🛑 Progress monitor stopped.", action="progress_stop", status="info")
+    finally:
+        write_buffer.close()
+    return monitor.aggregate()
+
+@log_script
+def main(interval=POLL_INTERVAL, once=False, scoped=True):
+    cfg = load_user_config(USER_CONFIG_PATH)
+    ok, device = ensure_jd_running_and_connected(cfg, USER_CONFIG_PATH, ORG_SECRETS_PATH)
+    if not ok or not device:
+        logprint("❌ Could not connect to MyJDownloader. Exiting.", action="jd_connect_fail", status="error")
+        return
+    monitor_progress(cfg, device, interval=interval, once=once, scoped=scoped)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Priority download scheduler between the Sheet and device.linkgrabber.
+
+Rows become jobs ordered by (Priority, Deadline, row order). Jobs are released to
+JDownloader only while fewer than max_in_flight of our packages are unfinished and
+their aggregate throughput is below max_bandwidth; the rest wait locally. Packages
+not measured yet (just released, or still in the linkgrabber) count at the in-flight
+average rate, or at the whole cap before anything has been measured, so one step
+never releases a burst past the bandwidth cap.
+
+Priority is read from a "Priority" column (urgent/high/normal/low or a number, lower
+runs first; blank is normal) and a "Deadline" column (ISO date/time, earlier first).
+When an urgent job is waiting and there is no capacity, the lowest-priority running
+package that is not nearly done is disabled in JD (parked) and requeued, so the urgent
+one starts immediately.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import datetime
+import heapq
+import itertools
+import time
+from downloader.jd_progress import ProgressMonitor, POLL_INTERVAL, format_bytes
+from utils.logger import logprint
+
+PRIORITY_COLNAME = "Priority"
+DEADLINE_COLNAME = "Deadline"
+PRIORITY_LEVELS = {"urgent": 0, "high": 1, "normal": 2, "low": 3}
+URGENT = PRIORITY_LEVELS["urgent"]
+NORMAL = PRIORITY_LEVELS["normal"]
+MAX_IN_FLIGHT = 4  # default cfg["max_in_flight"]
+PREEMPT_BELOW_PERCENT = 90  # running packages further along than this are never parked
+REFILL_INTERVAL = 30  # default cfg["refill_interval_s"]: seconds between Sheet re-reads for new rows
+
+def parse_priority(value):
+    value = str(value or "").strip().lower()
+    if not value:
+        return NORMAL
+    if value in PRIORITY_LEVELS:
+        return PRIORITY_LEVELS[value]
+    try:
+        return int(float(value))
+    except ValueError:
+        return NORMAL
+
+def parse_deadline(value):
+    """Deadline cell as a timestamp, or None if blank/unparseable."""
+    value = str(value or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+def jobs_from_rows(cfg, rows, job_number):
+    """Build scheduler jobs for every row with a YouTube URL and title (None rows are ignored)."""
+    from downloader.download_videos import extract_youtube_id
+    from utils.filename_generator import generate_ifl_filename
+    header = rows[0]
+    col_map = {key: idx for idx, key in enumerate(header)}
+
+    def cell(row, colname):
+        idx = col_map.get(colname)
+        return row[idx] if idx is not None and idx < len(row) else ""
+
+    jobs = []
+    for row_num, row in enumerate(rows[1:], start=2):
+        if row is None:
+            continue
+        url = cell(row, "URL")
+        yt_id = extract_youtube_id(url) if url else None
+        if not yt_id or not cell(row, "Title"):
+            continue
+        jobs.append({
+            "row": row_num,
+            "url": url,
+            "package": generate_ifl_filename(
+                youtube_id=yt_id,
+                channel=cell(row, "User"),
+                job_number=job_number,
+                resolution="1080",
+                researcher_initials=cfg["initials"],
+                description="DESCRIPTION"
+            ),
+            "priority": parse_priority(cell(row, PRIORITY_COLNAME)),
+            "deadline": parse_deadline(cell(row, DEADLINE_COLNAME))
+        })
+    return jobs
+
+class DownloadScheduler:
+    """Releases queued jobs to JDownloader under in-flight and bandwidth caps.
+
+    `device` receives every package unless a `pool` (jd_dispatch.DevicePool) is given.
+    `max_bandwidth` is in bytes/s (0 = no cap). With a `write_buffer`, released rows are
+    marked "Queued" in the Status column. `refill_interval` (cfg "refill_interval_s") is how
+    often run() asks for new rows, i.e. the longest an urgent row waits to be seen. Parking and failures are reported through `log`
+    (logprint's signature).
+    """
+
+    def __init__(self, cfg, device, pool=None, max_in_flight=None, max_bandwidth=None,
+                 write_buffer=None, clock=time.time, log=logprint, refill_interval=None):
+        self.cfg = cfg
+        self.device = device
+        self.pool = pool
+        self.max_in_flight = max_in_flight or int(cfg.get("max_in_flight", MAX_IN_FLIGHT))
+        if max_bandwidth is None:
+            max_bandwidth = float(cfg.get("max_bandwidth_mbps", 0)) * 1024 * 1024
+        self.max_bandwidth = max_bandwidth
+        if refill_interval is None:
+            refill_interval = float(cfg.get("refill_interval_s", REFILL_INTERVAL))
+        self.refill_interval = refill_interval
+        self.write_buffer = write_buffer
+        self.clock = clock
+        self.log = log
+        self.queue = []  # heap of (priority, deadline, seq, package)
+        self.jobs = {}  # package -> job
+        self.in_flight = {}  # package -> job
+        self.done = set()
+        self.monitors = {}  # device_id -> ProgressMonitor
+        self.throughput = 0
+        self.released = 0
+        self.preempted = 0
+        self.failed = 0
+        self._seq = itertools.count()
+
+    def push(self, job):
+        """Queue a job. Returns False if its package is already known to the scheduler."""
+        if job["package"] in self.jobs:
+            return False
+        job = dict(job, seq=next(self._seq))
+        self.jobs[job["package"]] = job
+        self._enqueue(job)
+        return True
+
+    def _enqueue(self, job):
+        deadline = job["deadline"] if job.get("deadline") is not None else float("inf")
+        heapq.heappush(self.queue, (job["priority"], deadline, job["seq"], job["package"]))
+
+    def _monitor(self, device):
+        if device.device_id not in self.monitors:
+            self.monitors[device.device_id] = ProgressMonitor(device, clock=self.clock)
+        return self.monitors[device.device_id]
+
+    def poll(self):
+        """Refresh in-flight state from JD. Returns the packages that finished since the last poll."""
+        progress = {}
+        for monitor in self.monitors.values():
+            monitor.poll()
+            for p in monitor.packages.values():
+                progress[p["name"]] = p
+        finished = []
+        throughput = 0
+        unmeasured = 0
+        for package, job in list(self.in_flight.items()):
+            p = progress.get(package)
+            if p is None and not job.get("uuid"):
+                unmeasured += 1  # still in the linkgrabber
+                continue
+            if p is not None:
+                job["uuid"] = p["uuid"]
+                job["percent"] = p["percent"]
+                job["throughput"] = p["throughput"]
+            if p is None or p["state"] == "finished":  # finished, or removed from JD by hand
+                self.in_flight.pop(package)
+                self.done.add(package)
+                finished.append(package)
+            elif p["throughput"] > 0:
+                throughput += p["throughput"]
+            else:
+                unmeasured += 1
+        self.throughput = throughput + unmeasured * self.estimated_rate()
+        return finished
+
+    def estimated_rate(self):
+        """Expected bytes/s of one package: the measured in-flight average, or the whole cap if none is measured."""
+        measured = [job["throughput"] for job in self.in_flight.values() if job.get("throughput")]
+        if measured:
+            return sum(measured) / len(measured)
+        return self.max_bandwidth
+
+    def has_capacity(self):
+        if len(self.in_flight) >= self.max_in_flight:
+            return False
+        return not self.max_bandwidth or self.throughput < self.max_bandwidth
+
+    def release(self, job):
+        device = job.get("device")
+        if job.get("parked"):
+            device.downloads.set_enabled(True, [], [job["uuid"]])
+            job["parked"] = False
+        else:
+            device = self.pool.pick() if self.pool else self.device
+            folder = self.pool.destination(device) if self.pool else self.cfg["download_dir"]
+            device.linkgrabber.add_links([{
+                "autostart": True,
+                "links": job["url"],
+                "packageName": job["package"],
+                "destinationFolder": folder
+            }])
+            job["device"] = device
+            self._monitor(device)
+            if self.write_buffer is not None:
+                self.write_buffer.set(job["row"], "Status", "Queued")
+        if self.max_bandwidth:
+            self.throughput += self.estimated_rate()  # counted until the next poll measures it
+        self.in_flight[job["package"]] = job
+        self.released += 1
+        print(f"📤 Released {job['package']} (priority {job['priority']}) to {device.name}")
+
+    def preempt(self):
+        """Park the lowest-priority running package so a waiting urgent job can start. Returns True if one was parked."""
+        candidates = [
+            job for job in self.in_flight.values()
+            if job["priority"] > URGENT and job.get("uuid") and job.get("percent", 0) < PREEMPT_BELOW_PERCENT
+        ]
+        if not candidates:
+            return False
+        victim = max(candidates, key=lambda j: (j["priority"], j.get("deadline") or float("inf"), j["seq"]))
+        victim["device"].downloads.set_enabled(False, [], [victim["uuid"]])
+        victim["parked"] = True
+        self.in_flight.pop(victim["package"])
+        self.throughput = max(self.throughput - victim.get("throughput", 0), 0)
+        self._enqueue(victim)
+        self.preempted += 1
+        self.log(
+            f"⏸️ Parked {victim['package']} for an urgent download",
+            action="download_preempted",
+            status="info",
+            sheet_row=victim["row"],
+            extra_info={"package": victim["package"], "priority": victim["priority"]}
+        )
+        return True
+
+    def step(self):
+        """Poll JD, preempt for urgent jobs, then release queued jobs while under the caps."""
+        finished = self.poll()
+        if self.queue and self.queue[0][0] <= URGENT and not self.has_capacity():
+            self.preempt()
+        while self.queue and self.has_capacity():
+            _, _, _, package = heapq.heappop(self.queue)
+            job = self.jobs[package]
+            try:
+                self.release(job)
+            except Exception as e:
+                self.log(
+                    f"❌ Failed to send download for {package}: {e}",
+                    action="download_failed",
+                    status="error",
+                    error_message=str(e),
+                    sheet_row=job["row"]
+                )
+                self.failed += 1
+        return finished
+
+    def idle(self):
+        return not self.queue and not self.in_flight
+
+    def stats(self):
+        return {
+            "queued": len(self.queue),
+            "in_flight": len(self.in_flight),
+            "done": len(self.done),
+            "released": self.released,
+            "preempted": self.preempted,
+            "failed": self.failed,
+            "throughput": self.throughput
+        }
+
+    def run(self, interval=POLL_INTERVAL, refill=None, refill_interval=None, sleep=time.sleep):
+        """Step every `interval` seconds until everything queued has finished.
+
+        `refill()` returns fresh jobs (e.g. new urgent rows) and is called every `refill_interval`
+        seconds (default: self.refill_interval).
+        """
+        if refill_interval is None:
+            refill_interval = self.refill_interval
+        last_refill = self.clock()
+        while True:
+            if refill and self.clock() - last_refill >= refill_interval:
+                added = sum(self.push(job) for job in refill())
+                if added:
+                    print(f"➕ {added} new row(s) queued.")
+                last_refill = self.clock()
+            self.step()
+            stats = self.stats()
+            print(
+                f"🗂️ {stats['queued']} waiting, {stats['in_flight']} in flight, {stats['done']} done — "
+                f"{format_bytes(stats['throughput'])}/s"
+            )
+            if self.idle():
+                return stats
+            sleep(interval)
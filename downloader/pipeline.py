@@ -0,0 +1,341 @@
+"""Single-pass streaming pipeline: Sheet row -> YouTube metadata -> Sheet write -> JD dispatch.
+
+Instead of running validate, then download, each as a serial loop, rows flow through
+stages connected by bounded queues, so metadata fetches, Sheet writes and JD dispatch
+overlap:
+
+    read ─▶ fetch (FETCH_WORKERS threads) ─▶ write ─▶ dispatch
+
+- read      walks this researcher's unprocessed rows, skipping (and logging) rows without
+            a YouTube ID; as in `validate`, every row whose ID appears more than once in the
+            tab is highlighted and the others are cleared, and, as in `download`, all of
+            them are still sent
+- fetch     fetch_youtube_metadata per row; a row without metadata (private video, API
+            error, quota used up) still goes on with the Sheet's own Title/User, as in
+            `download`, unless it has no Title either
+- write     queues Title/User/date/duration on the SheetWriteBuffer (batched, background);
+            rows without metadata pass through unchanged
+- dispatch  generate_ifl_filename + linkgrabber.add_links, then Status "Queued"
+
+A full queue blocks the stage feeding it (backpressure), so a slow JD connection slows
+the fetches instead of piling up rows in memory. Per-stage counts, rates and time spent
+blocked are printed every STATS_INTERVAL seconds and at the end.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import queue
+import threading
+import time
+from utils.logger import log_event, logprint, log_script
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
+ORG_SECRETS_PATH = os.path.join(BASE_DIR, "config", "org_secrets.json")
+
+FETCH_WORKERS = 8
+QUEUE_SIZE = 32  # max items waiting between two stages
+STATS_INTERVAL = 10  # seconds between stats lines
+
+_STOP = object()
+
+class Stage:
+    """`workers` threads applying `func` to items from `inbox` and passing results to `outbox`.
+
+    `func` returns the item to forward, or None to drop it. Errors are logged and the item
+    is dropped. Once every worker has seen the end of the input, the end is passed on.
+    """
+
+    def __init__(self, name, func, inbox, outbox=None, workers=1):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.blocked_s = 0.0  # time spent waiting for room in outbox
+        self.started_at = None
+        self.finished_at = None
+        self._alive = workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        self.started_at = time.time()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"pipeline-{self.name}-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _put(self, item):
+        if self.outbox is None:
+            return
+        started = time.perf_counter()
+        self.outbox.put(item)
+        with self._lock:
+            self.blocked_s += time.perf_counter() - started
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                with self._lock:
+                    self._alive -= 1
+                    last = self._alive == 0
+                if last:
+                    self.finished_at = time.time()
+                    self._put(_STOP)
+                else:
+                    self.inbox.put(_STOP)  # let the sibling workers see it too
+                return
+            started = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                result = None
+                with self._lock:
+                    self.errors += 1
+                logprint(
+                    f"❌ Pipeline {self.name} failed on row {item.get('row')}: {e}",
+                    action="pipeline_error",
+                    status="error",
+                    error_message=str(e),
+                    sheet_row=item.get("row"),
+                    extra_info={"stage": self.name}
+                )
+            with self._lock:
+                self.busy_s += time.perf_counter() - started
+                if result is None:
+                    self.dropped += 1
+                else:
+                    self.processed += 1
+            if result is not None:
+                self._put(result)
+
+    def join(self, timeout=None):
+        """Wait for the workers; returns True once all have finished."""
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.time(), 0))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def stats(self):
+        elapsed = max((self.finished_at or time.time()) - (self.started_at or time.time()), 1e-9)
+        return {
+            "stage": self.name,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "rate": round(self.processed / elapsed, 2),
+            "busy_s": round(self.busy_s, 2),
+            "blocked_s": round(self.blocked_s, 2),
+            "queued": self.inbox.qsize()
+        }
+
+def print_stats(read_count, stages, read_blocked_s=0.0):
+    parts = [f"read {read_count}" + (f" (blocked {read_blocked_s:.1f}s)" if read_blocked_s >= 0.1 else "")]
+    for stage in stages:
+        s = stage.stats()
+        parts.append(
+            f"{s['stage']} {s['processed']} ({s['rate']}/s, q {s['queued']}"
+            + (f", blocked {s['blocked_s']}s" if s["blocked_s"] >= 0.1 else "") + ")"
+        )
+    print("🚰 " + " | ".join(parts))
+
+def run_pipeline(cfg, worksheet, rows, api_key, device, job_number, all_urls=None, pool=None,
+                 workers=FETCH_WORKERS, queue_size=QUEUE_SIZE, stats_interval=STATS_INTERVAL):
+    """Stream rows through fetch, write and dispatch. Returns per-stage stats."""
+    from sheet.sheet_metadata_validator import (
+        CLEAR_FORMAT, DUPLICATE_FORMAT, duplicate_id_rows, extract_youtube_id, fetch_youtube_metadata
+    )
+    from sheet.sheet_tools import open_write_buffer
+    from sheet.sheet_scope import _col_letter
+    from utils.filename_generator import generate_ifl_filename
+
+    header = rows[0]
+    col_map = {name: idx for idx, name in enumerate(header)}
+    url_col = col_map["URL"]
+    if all_urls is None:
+        all_urls = [row[url_col] if row is not None and url_col < len(row) else "" for row in rows[1:]]
+    youtube_id_map = duplicate_id_rows(all_urls)
+
+    write_buffer = open_write_buffer((worksheet, header))
+    to_fetch = queue.Queue(maxsize=queue_size)
+    to_write = queue.Queue(maxsize=queue_size)
+    to_dispatch = queue.Queue(maxsize=queue_size)
+    duplicates = []
+    unique = []
+    skipped = 0
+    unnamed = []  # rows dropped by fetch: no metadata and no Title
+
+    def cell(row, colname):
+        idx = col_map.get(colname)
+        return row[idx] if idx is not None and idx < len(row) else ""
+
+    def fetch(item):
+        item["meta"] = fetch_youtube_metadata(item["yt_id"], api_key)
+        if item["meta"] is None and not item["title"]:
+            # Nothing to name the package after; `download` skips these too.
+            unnamed.append(item["row"])
+            log_event(
+                script="pipeline.py",
+                action="skip_row",
+                status="skipped",
+                sheet_row=item["row"],
+                extra_info={"url": item["url"], "reason": "no metadata and no Title"}
+            )
+            return None
+        return item
+
+    def write(item):
+        meta = item["meta"]
+        if meta is None:
+            return item
+        write_buffer.set_row(item["row"], {
+            "Title": meta["title"],
+            "User": meta["channel"],
+            "date": meta["publishedAt"],
+            "duration": meta["duration"]
+        })
+        return item
+
+    def dispatch(item):
+        filename = generate_ifl_filename(
+            youtube_id=item["yt_id"],
+            channel=item["meta"]["channel"] if item["meta"] else item["channel"],
+            job_number=job_number,
+            resolution="1080",
+            researcher_initials=cfg["initials"],
+            description="DESCRIPTION"
+        )
+        target = pool.pick() if pool else device
+        target.linkgrabber.add_links([{
+            "autostart": True,
+            "links": item["url"],
+            "packageName": filename,
+            "destinationFolder": pool.destination(target) if pool else cfg["download_dir"]
+        }])
+        write_buffer.set(item["row"], "Status", "Queued")
+        logprint(
+            f"📤 Queued {filename}" + (f" on {target.name}" if pool else ""),
+            action="download_sent",
+            status="success",
+            sheet_row=item["row"],
+            extra_info={"url": item["url"], "device": target.name}
+        )
+        return item
+
+    stages = [
+        Stage("fetch", fetch, to_fetch, to_write, workers=workers).start(),
+        Stage("write", write, to_write, to_dispatch).start(),
+        Stage("dispatch", dispatch, to_dispatch).start()
+    ]
+    read_count = 0
+    read_blocked_s = 0.0
+    last_stats = time.time()
+    try:
+        for row_num, row in enumerate(rows[1:], start=2):
+            if row is None:
+                continue
+            url = row[url_col] if url_col < len(row) else ""
+            yt_id = extract_youtube_id(url) if url else None
+            if not yt_id:
+                if url:
+                    unique.append(row_num)
+                log_event(
+                    script="pipeline.py",
+                    action="skip_row",
+                    status="skipped",
+                    sheet_row=row_num,
+                    extra_info={"url": url, "reason": "no YouTube ID"}
+                )
+                skipped += 1
+                continue
+            group = youtube_id_map.get(yt_id, [row_num])
+            if len(group) > 1:
+                duplicates.append(row_num)
+                logprint(
+                    f"⛔ Duplicate ID in row {row_num} (also in rows: {', '.join(map(str, group))})",
+                    action="duplicate_found",
+                    status="warning",
+                    sheet_row=row_num,
+                    extra_info={"yt_id": yt_id, "rows": group}
+                )
+            else:
+                unique.append(row_num)
+            started = time.perf_counter()
+            item = {"row": row_num, "url": url, "yt_id": yt_id, "title": cell(row, "Title"), "channel": cell(row, "User")}
+            to_fetch.put(item)  # blocks while fetch is behind
+            read_blocked_s += time.perf_counter() - started
+            read_count += 1
+            if time.time() - last_stats >= stats_interval:
+                print_stats(read_count, stages, read_blocked_s)
+                last_stats = time.time()
+        to_fetch.put(_STOP)
+        for stage in stages:
+            while not stage.join(timeout=stats_interval):
+                print_stats(read_count, stages, read_blocked_s)
+    finally:
+        letter = _col_letter(url_col)
+        formats = [{"range": f"{letter}{row_num}", "format": DUPLICATE_FORMAT} for row_num in duplicates]
+        formats += [{"range": f"{letter}{row_num}", "format": CLEAR_FORMAT} for row_num in unique]
+        if formats:
+            worksheet.batch_format(formats)
+        if duplicates:
+            print(f"⛔ {len(duplicates)} row(s) with a duplicate ID highlighted.")
+        write_buffer.close()
+
+    print_stats(read_count, stages, read_blocked_s)
+    stats = {
+        "read": read_count,
+        "read_blocked_s": round(read_blocked_s, 2),
+        "skipped": skipped + len(unnamed),
+        "duplicates": len(duplicates),
+        "stages": [stage.stats() for stage in stages]
+    }
+    logprint(
+        f"\nSummary: {read_count} rows read, {stages[-1].processed} queued in JD, "
+        f"{skipped + len(unnamed)} skipped, {sum(s.errors for s in stages)} errors, {len(duplicates)} duplicates.",
+        action="pipeline_summary",
+        status="info",
+        extra_info=stats
+    )
+    return stats
+
+@log_script
+def main(scoped=True, workers=FETCH_WORKERS, balance=None):
+    from downloader.download_videos import extract_job_number
+    from downloader.jd_dispatch import dispatch_mode, open_device_pool
+    from sheet.sheet_metadata_validator import get_sheet, load_org_secrets, load_user_config
+    from utils.jd_connection_utils import ensure_jd_running_and_connected
+
+    cfg = load_user_config()
+    if not cfg:
+        return
+    secrets = load_org_secrets()
+    if not secrets or not secrets.get("youtube_api_key"):
+        logprint("❌ No youtube_api_key in org_secrets.json.", action="youtube_key_missing", status="error")
+        return
+    worksheet, rows, all_urls = get_sheet(cfg, scoped=scoped)
+    if worksheet is None:
+        logprint("❌ Sheet is unreachable; the pipeline needs a live connection.", action="sheet_unreachable", status="error")
+        return
+    ok, device = ensure_jd_running_and_connected(cfg, USER_CONFIG_PATH, ORG_SECRETS_PATH)
+    if not ok or not device:
+        logprint("❌ Could not connect to MyJDownloader. Exiting.", action="jd_connect_fail", status="error")
+        return
+    if balance is None:
+        balance = dispatch_mode(cfg) == "balanced"
+    pool = open_device_pool(cfg, ORG_SECRETS_PATH) if balance else None
+    job_number = extract_job_number(worksheet.spreadsheet.title) or "0000"
+    return run_pipeline(
+        cfg, worksheet, rows, secrets["youtube_api_key"], device, job_number,
+        all_urls=all_urls, pool=pool, workers=workers
+    )
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,30 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import shutil
+import time
+import datetime
 from utils.filename_generator import generate_ifl_filename
 from sheet.sheet_tools import (
+    get_sheet,
+    refresh_sheet_data,
+    open_write_buffer,
     get_metadata_by_title,
     update_status_by_title,
     normalize
 )
 from utils.jd_connection_utils import (
+    connect_org_devices,
     ensure_jd_running_and_connected,
     load_user_config
 )
 from utils.logger import logprint, log_script
+from daemon.client import request_if_running, print_daemon_result
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
 ORG_SECRETS_PATH = os.path.join(BASE_DIR, "config", "org_secrets.json")
 SERVICE_ACCOUNT_PATH = os.path.join(BASE_DIR, "private", "stalkrorgsheetapi-4feb1ec20bbe.json")
+WATCH_INTERVAL = 60  # seconds between scans in watch mode
 
 def fuzzy_find_file(directory, title):
     n_title = normalize(title)
@@ -27,31 +35,75 @@ def fuzzy_find_file(directory, title):
             return fname
     return None
 
-def rename_finished_packages(cfg, device):
+def finished_packages(devices):
+    """Finished packages from every device, each with the device name under "device"."""
+    packages = []
+    for device in devices:
+        try:
+            found = device.downloads.query_packages()
+        except Exception as e:
+            logprint(
+                f"⚠️ Could not query device '{device.name}': {e}",
+                action="device_query_failed",
+                status="warning",
+                error_message=str(e),
+                extra_info={"device": device.name}
+            )
+            continue
+        for pkg in found:
+            if pkg.get("status") == "Finished":
+                packages.append(dict(pkg, device=device.name))
+    return packages
+
+def package_dirs(cfg, pkg):
+    """Folders to look in for a finished package: its saveTo when reachable from here, then the configured ones."""
+    dirs = []
+    for directory in (pkg.get("saveTo"), cfg.get("device_dirs", {}).get(pkg.get("device")), cfg["download_dir"]):
+        if directory and directory not in dirs and os.path.isdir(directory):
+            dirs.append(directory)
+    return dirs
+
+def rename_finished_packages(cfg, device, sheet_data=None, write_buffer=None, scoped=True):
+    """Rename finished JD packages and mark their rows. Returns summary counts.
+
+    `device` may be a list of devices (all org devices) to pick up packages finished on any of them.
+
+    The Sheet is opened at most once per scan; pass `sheet_data` (from get_sheet) to reuse an open one.
+    Status/filename/completion updates go through `write_buffer`; without one, a buffer is created
+    for this scan and flushed at the end.
+    """
+    owns_buffer = write_buffer is None
     logprint("🔍 Scanning for completed downloads to rename...", action="start_scan", status="info")
-    packages = device.downloads.query_packages()
+    devices = device if isinstance(device, (list, tuple)) else [device]
+    packages = finished_packages(devices)
     renamed = 0
     errors = 0
     not_found = 0
     sheet_not_found = 0
 
     for pkg in packages:
-        if pkg.get("status") != "Finished":
-            continue
         pkg_name = pkg.get("name")
         possible_title = pkg_name
-        fname = fuzzy_find_file(cfg["download_dir"], possible_title)
+        fname = None
+        for directory in package_dirs(cfg, pkg):
+            fname = fuzzy_find_file(directory, possible_title)
+            if fname:
+                break
         if not fname:
             logprint(
-                f"⚠️ No file found in {cfg['download_dir']} matching title: {possible_title}",
+                f"⚠️ No file found in {', '.join(package_dirs(cfg, pkg)) or cfg['download_dir']} matching title: {possible_title}",
                 action="file_not_found",
                 status="warning",
-                extra_info={"pkg_name": pkg_name}
+                extra_info={"pkg_name": pkg_name, "device": pkg["device"]}
             )
             not_found += 1
             continue
 
-        rowdata = get_metadata_by_title(cfg, SERVICE_ACCOUNT_PATH, possible_title)
+        if sheet_data is None:
+            sheet_data = get_sheet(cfg, SERVICE_ACCOUNT_PATH, scoped=scoped)
+        if write_buffer is None:
+            write_buffer = open_write_buffer(sheet_data)
+        rowdata = get_metadata_by_title(cfg, SERVICE_ACCOUNT_PATH, possible_title, sheet_data=sheet_data)
         if not rowdata:
             logprint(
                 f"⚠️ No Sheet row found for title: {possible_title}",
@@ -72,8 +124,8 @@ def rename_finished_packages(cfg, device):
         )
 
         ext = os.path.splitext(fname)[1]
-        source = os.path.join(cfg["download_dir"], fname)
-        target = os.path.join(cfg["download_dir"], f"{template_filename}{ext}")
+        source = os.path.join(directory, fname)
+        target = os.path.join(directory, f"{template_filename}{ext}")
 
         if source == target:
             logprint(
@@ -93,7 +145,15 @@ def rename_finished_packages(cfg, device):
                 extra_info={"old": fname, "new": os.path.basename(target)}
             )
             renamed += 1
-            update_status_by_title(cfg, SERVICE_ACCOUNT_PATH, possible_title, "Renamed")
+            update_status_by_title(
+                cfg, SERVICE_ACCOUNT_PATH, possible_title, "Renamed",
+                sheet_data=sheet_data,
+                write_buffer=write_buffer,
+                extra_fields={
+                    "Filename": os.path.basename(target),
+                    "Completed At": datetime.datetime.now().isoformat(timespec="seconds")
+                }
+            )
         except Exception as e:
             logprint(
                 f"❌ Failed to rename {fname}: {e}",
@@ -104,6 +164,9 @@ def rename_finished_packages(cfg, device):
             )
             errors += 1
 
+    if owns_buffer and write_buffer is not None:
+        write_buffer.close()
+
     # Summary log
     logprint(
         f"\nSummary: {renamed} files renamed, {not_found} not found, {sheet_not_found} sheet rows not found, {errors} errors.",
@@ -116,16 +179,56 @@ def rename_finished_packages(cfg, device):
             "errors": errors
         }
     )
+    return {
+        "renamed": renamed,
+        "not_found": not_found,
+        "sheet_not_found": sheet_not_found,
+        "errors": errors
+    }
+
+def watch_finished_packages(cfg, device, interval=WATCH_INTERVAL, scoped=True):
+    """Run rename_finished_packages every `interval` seconds until Ctrl+C."""
+    logprint(
+        f"👀 Watching for finished downloads every {interval}s (Ctrl+C to stop)...",
+        action="watch_start",
+        status="info",
+        extra_info={"interval": interval}
+    )
+    sheet_data = get_sheet(cfg, SERVICE_ACCOUNT_PATH, scoped=scoped)
+    write_buffer = open_write_buffer(sheet_data)
+    try:
+        while True:
+            rename_finished_packages(cfg, device, sheet_data=sheet_data, write_buffer=write_buffer)
+            time.sleep(interval)
+            if scoped:
+                sheet_data = get_sheet(cfg, SERVICE_ACCOUNT_PATH, scoped=True)
+            else:
+                sheet_data = refresh_sheet_data(sheet_data)
+    except KeyboardInterrupt:
+        logprint("🛑 Watcher stopped.", action="watch_stop", status="info")
+    finally:
+        write_buffer.close()
 
 @log_script
-def main():
+def main(watch=False, interval=WATCH_INTERVAL, scoped=True):
+    if not watch:
+        daemon_result = request_if_running("rename", scoped=scoped)
+        if daemon_result is not None:
+            print_daemon_result(daemon_result)
+            return
+
     cfg = load_user_config(USER_CONFIG_PATH)
     ok, device = ensure_jd_running_and_connected(cfg, USER_CONFIG_PATH, ORG_SECRETS_PATH)
     if not ok or not device:
         logprint("❌ Could not connect to MyJDownloader. Exiting.", action="jd_connect_fail", status="error")
         return
+    # Packages may have been sent to any org device (balanced mode, or download/pipeline --balance).
+    device = connect_org_devices(cfg, ORG_SECRETS_PATH) or device
 
-    rename_finished_packages(cfg, device)
+    if watch:
+        watch_finished_packages(cfg, device, interval, scoped=scoped)
+    else:
+        rename_finished_packages(cfg, device, scoped=scoped)
 
 if __name__ == "__main__":
     main()
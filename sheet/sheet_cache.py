@@ -0,0 +1,141 @@
+"""Local cache of the service-account access token and spreadsheet metadata.
+
+The token is reused until shortly before it expires. Spreadsheet ID, tab list,
+sheet IDs and header rows are reused for METADATA_TTL seconds; the first read on
+a cached tab doubles as validation, and a failed read drops the entry.
+"""
+import os
+import json
+import datetime
+import gspread
+from gspread.spreadsheet import Spreadsheet
+from gspread.worksheet import Worksheet
+from gspread.utils import extract_id_from_url
+from google.oauth2.service_account import Credentials
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+TOKEN_CACHE_PATH = os.path.join(CACHE_DIR, "sheets_token.json")
+METADATA_CACHE_PATH = os.path.join(CACHE_DIR, "sheet_metadata.json")
+TOKEN_EXPIRY_MARGIN = 300  # seconds; refresh a bit before Google's expiry
+METADATA_TTL = 6 * 3600  # seconds
+
+def _read_cache(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_cache(path, data):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.chmod(tmp_path, 0o600)  # the token file is a bearer credential
+    os.replace(tmp_path, path)
+
+def _utcnow():
+    # google-auth compares naive UTC datetimes
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+# --- Access token ---
+
+def authorize(service_account_path, scopes):
+    """Return an authorized gspread client, reusing a cached access token until it expires."""
+    from google.auth.transport.requests import Request
+
+    creds = Credentials.from_service_account_file(service_account_path, scopes=scopes)
+    key = f"{creds.service_account_email}|{' '.join(sorted(scopes))}"
+    tokens = _read_cache(TOKEN_CACHE_PATH)
+    cached = tokens.get(key)
+    expiry = datetime.datetime.fromisoformat(cached["expiry"]) if cached else None
+
+    if expiry and expiry - datetime.timedelta(seconds=TOKEN_EXPIRY_MARGIN) > _utcnow():
+        creds.token = cached["token"]
+        creds.expiry = expiry
+    else:
+        creds.refresh(Request())
+        tokens[key] = {"token": creds.token, "expiry": creds.expiry.isoformat()}
+        _write_cache(TOKEN_CACHE_PATH, tokens)
+    return gspread.authorize(creds)
+
+# --- Spreadsheet metadata ---
+
+def _cached_entry(sheet_url):
+    entry = _read_cache(METADATA_CACHE_PATH).get(sheet_url)
+    if not entry:
+        return None
+    age = _utcnow() - datetime.datetime.fromisoformat(entry["fetched_at"])
+    if age.total_seconds() > METADATA_TTL:
+        return None
+    return entry
+
+def invalidate_sheet_metadata(sheet_url):
+    cache = _read_cache(METADATA_CACHE_PATH)
+    if cache.pop(sheet_url, None) is not None:
+        _write_cache(METADATA_CACHE_PATH, cache)
+
+def fetch_sheet_metadata(client, sheet_url):
+    """Fetch spreadsheet + tab properties in one call and store them. Returns the cache entry."""
+    spreadsheet_id = extract_id_from_url(sheet_url)
+    metadata = client.http_client.fetch_sheet_metadata(spreadsheet_id)
+    properties = dict(metadata["properties"])
+    properties["id"] = spreadsheet_id
+    cache = _read_cache(METADATA_CACHE_PATH)
+    old_headers = (cache.get(sheet_url) or {}).get("headers", {})
+    worksheets = {s["properties"]["title"]: s["properties"] for s in metadata.get("sheets", [])}
+    entry = {
+        "spreadsheet_id": spreadsheet_id,
+        "spreadsheet": properties,
+        "worksheets": worksheets,
+        "headers": {title: header for title, header in old_headers.items() if title in worksheets},
+        "fetched_at": _utcnow().isoformat()
+    }
+    cache[sheet_url] = entry
+    _write_cache(METADATA_CACHE_PATH, cache)
+    return entry
+
+def _build(client, entry, tab_title):
+    # Spreadsheet.__init__ always refetches metadata, so assemble it from the cached properties.
+    spreadsheet = Spreadsheet.__new__(Spreadsheet)
+    spreadsheet.client = client.http_client
+    spreadsheet._properties = dict(entry["spreadsheet"])
+    worksheet = Worksheet(
+        spreadsheet,
+        dict(entry["worksheets"][tab_title]),
+        entry["spreadsheet_id"],
+        client.http_client
+    )
+    return spreadsheet, worksheet
+
+def list_tabs(client, sheet_url):
+    """Return tab titles in Sheet order."""
+    entry = _cached_entry(sheet_url) or fetch_sheet_metadata(client, sheet_url)
+    return [title for title, props in sorted(entry["worksheets"].items(), key=lambda kv: kv[1].get("index", 0))]
+
+def cached_header(sheet_url, tab_title):
+    """Return the last header row seen for the tab, or None."""
+    entry = _cached_entry(sheet_url)
+    return (entry or {}).get("headers", {}).get(tab_title)
+
+def remember_header(sheet_url, tab_title, header):
+    cache = _read_cache(METADATA_CACHE_PATH)
+    entry = cache.get(sheet_url)
+    if entry and entry.get("headers", {}).get(tab_title) != header:
+        entry.setdefault("headers", {})[tab_title] = header
+        _write_cache(METADATA_CACHE_PATH, cache)
+
+def open_worksheet(client, sheet_url, tab_title):
+    """Return (spreadsheet, worksheet) without any API call when the metadata is cached.
+
+    Raises gspread.exceptions.WorksheetNotFound if the tab does not exist.
+    """
+    entry = _cached_entry(sheet_url)
+    if not entry or tab_title not in entry["worksheets"]:
+        entry = fetch_sheet_metadata(client, sheet_url)
+        if tab_title not in entry["worksheets"]:
+            raise gspread.exceptions.WorksheetNotFound(tab_title)
+    return _build(client, entry, tab_title)
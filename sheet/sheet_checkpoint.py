@@ -0,0 +1,172 @@
+"""Checkpoints for long validate/download runs, so `--resume` continues an interrupted run.
+
+A checkpoint (cache/checkpoints/<workflow>_<spreadsheet id>_<tab>.json) is rewritten
+every CHECKPOINT_EVERY rows or CHECKPOINT_INTERVAL seconds and when the run fails. It holds:
+
+    done      key of every completed row, key = YouTube ID (or URL); one entry per row, so
+              rows sharing an ID are counted separately
+    pending   [[row, column name, value, key], ...] Sheet writes not yet confirmed
+    metadata  {key: fetched metadata} for rows whose writes are still pending, so a row
+              whose pending writes cannot be re-targeted is redone without an API call
+
+Rows are matched by key, not row number, so inserting, deleting or sorting rows between
+runs is safe: completed rows are skipped wherever they now are (each saved completion
+skips one row; rows completed during the current run never cause a skip), and pending
+writes are re-targeted to the row that now holds their key (or dropped if it is gone or ambiguous).
+A run that finishes with nothing pending deletes its checkpoint.
+"""
+import os
+import json
+import time
+from collections import Counter
+from sheet.sheet_cache import CACHE_DIR
+
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")
+CHECKPOINT_EVERY = 50  # rows between checkpoints
+CHECKPOINT_INTERVAL = 30  # max seconds between checkpoints
+
+def row_key(url):
+    """Identity used to recognise a row across runs: its YouTube ID, else the URL itself."""
+    from sheet.sheet_metadata_validator import extract_youtube_id
+    url = (url or "").strip()
+    return extract_youtube_id(url) or url or None
+
+class RunCheckpoint:
+    def __init__(self, workflow, spreadsheet_id, tab, every=CHECKPOINT_EVERY, interval=CHECKPOINT_INTERVAL):
+        self.workflow = workflow
+        self.spreadsheet_id = spreadsheet_id
+        self.tab = tab
+        self.every = every
+        self.interval = interval
+        safe_tab = "".join(c if c.isalnum() or c in "-_" else "_" for c in tab)
+        self.path = os.path.join(CHECKPOINT_DIR, f"{workflow}_{spreadsheet_id}_{safe_tab}.json")
+        self.done = Counter()  # key -> rows completed, this run and the interrupted one
+        self.resumed_keys = Counter()  # key -> completions loaded from the checkpoint not yet skipped
+        self.row_keys = {}  # current row number -> key, for rows completed or re-queued this run
+        self.metadata = {}  # key -> metadata
+        self.pending = []
+        self.last_row = None
+        self.resumed = False
+        self._since_save = 0
+        self._saved_at = time.time()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def start(self, resume=False):
+        """Load the previous checkpoint when resuming; otherwise start clean. Returns self."""
+        if resume and self.exists():
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            self.done = Counter(state.get("done", []))
+            self.resumed_keys = Counter(self.done)
+            self.metadata = state.get("metadata", {})
+            self.pending = state.get("pending", [])
+            self.last_row = state.get("last_row")
+            self.resumed = True
+            print(
+                f"⏯️ Resuming {self.workflow} on '{self.tab}': {sum(self.done.values())} row(s) already done "
+                f"(last row {self.last_row}), {len(self.pending)} pending write(s)."
+            )
+        elif resume:
+            print(f"ℹ️ No interrupted {self.workflow} run to resume on '{self.tab}'; starting from the top.")
+        elif self.exists():
+            print(f"ℹ️ Discarding the checkpoint of an interrupted {self.workflow} run (use --resume to continue it).")
+            os.remove(self.path)
+        return self
+
+    def take_resumed(self, key):
+        """True if the interrupted run completed a row with `key`; each saved completion skips one row."""
+        if key is None or self.resumed_keys[key] <= 0:
+            return False
+        self.resumed_keys[key] -= 1
+        return True
+
+    def metadata_for(self, key):
+        return self.metadata.get(key)
+
+    def mark_done(self, row_num, key, metadata=None):
+        if key is None:
+            return
+        self.row_keys[row_num] = key
+        self.done[key] += 1
+        self.last_row = row_num
+        if metadata is not None:
+            self.metadata[key] = metadata
+        self._since_save += 1
+
+    def restore_pending(self, write_buffer, rows):
+        """Re-queue the previous run's unconfirmed writes on the rows that now hold their keys."""
+        if not self.pending:
+            return 0
+        header = rows[0]
+        url_col = header.index("URL") if "URL" in header else None
+        rows_by_key = {}
+        for row_num, row in enumerate(rows[1:], start=2):
+            if row is not None and url_col is not None and url_col < len(row):
+                rows_by_key.setdefault(row_key(row[url_col]), []).append(row_num)
+        requeued = dropped = 0
+        redo = set()
+        for row_num, colname, value, key in self.pending:
+            matches = rows_by_key.get(key, [])
+            if row_num not in matches:
+                # Row moved (or is outside a scoped read): follow the key if it is unambiguous.
+                row_num = matches[0] if len(matches) == 1 else None
+            if row_num is None:
+                redo.add(key)
+                dropped += 1
+                continue
+            write_buffer.set(row_num, colname, value)
+            self.row_keys[row_num] = key
+            requeued += 1
+        for key in redo:
+            # Process that row again (from the saved metadata, so without an API call).
+            if self.resumed_keys[key] > 0:
+                self.resumed_keys[key] -= 1
+                self.done[key] -= 1
+        if dropped:
+            print(f"⚠️ {dropped} pending write(s) no longer match a single row; those rows will be processed again.")
+        if requeued:
+            print(f"♻️ Re-queued {requeued} pending write(s) from the interrupted run.")
+        self.pending = []
+        return requeued
+
+    def maybe_save(self, write_buffer=None):
+        if self._since_save >= self.every or time.time() - self._saved_at >= self.interval:
+            self.save(write_buffer)
+
+    def save(self, write_buffer=None):
+        """Write the checkpoint atomically, including the buffer's unconfirmed writes."""
+        if write_buffer is not None:
+            # Writes on rows this run did not complete (e.g. replayed from the replica) have no key; skip them.
+            self.pending = [
+                [row, colname, value, self.row_keys[row]]
+                for (row, colname), value in sorted(write_buffer.snapshot().items(), key=lambda kv: (kv[0][0], str(kv[0][1])))
+                if row in self.row_keys
+            ]
+        pending_keys = {key for _, _, _, key in self.pending}
+        state = {
+            "workflow": self.workflow,
+            "spreadsheet_id": self.spreadsheet_id,
+            "tab": self.tab,
+            "updated_at": time.time(),
+            "last_row": self.last_row,
+            "done": sorted(self.done.elements()),
+            "pending": self.pending,
+            "metadata": {key: meta for key, meta in self.metadata.items() if key in pending_keys}
+        }
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._since_save = 0
+        self._saved_at = time.time()
+
+    def finish(self, write_buffer=None):
+        """Delete the checkpoint if everything reached the Sheet, otherwise keep it for --resume."""
+        if write_buffer is not None and any(row in self.row_keys for row, _ in write_buffer.snapshot()):
+            self.save(write_buffer)
+            print("⚠️ Some writes did not reach the Sheet; run again with --resume to retry them.")
+        elif self.exists():
+            os.remove(self.path)
@@ -4,10 +4,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import json
 import re
 import gspread
-from google.oauth2.service_account import Credentials
 import requests
 import isodate
 from utils.logger import log_event, logprint, log_script
+from sheet.sheet_cache import authorize, list_tabs
+from sheet.sheet_checkpoint import RunCheckpoint, row_key
+from sheet.sheet_scope import read_tab_rows, VALIDATE_DONE
+from sheet.sheet_tools import open_write_buffer
+from daemon.client import request_if_running, print_daemon_result
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
@@ -59,6 +63,9 @@ def load_org_secrets():
             )
             return None
 
+DUPLICATE_FORMAT = {"backgroundColor": {"red": 1, "green": 0.8, "blue": 0}}
+CLEAR_FORMAT = {"backgroundColor": {"red": 1, "green": 1, "blue": 1}}
+
 def extract_youtube_id(url):
     match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11})', url)
     return match.group(1) if match else None
@@ -113,80 +120,91 @@ def fetch_youtube_metadata(video_id, api_key):
         "duration": parsed_duration
     }
 
-def get_sheet(cfg):
+def duplicate_id_rows(all_urls):
+    """Map each YouTube ID to the sheet rows (2-based) that hold it, from the URL column of the whole tab.
+
+    An ID with more than one row is a duplicate: every row in its group is highlighted.
+    """
+    youtube_id_map = {}
+    for i, url in enumerate(all_urls):
+        yt_id = extract_youtube_id(url or "")
+        if yt_id:
+            youtube_id_map.setdefault(yt_id, []).append(i+2)
+    return youtube_id_map
+
+def choose_tab(all_tabs):
+    print("Available tabs:")
+    for idx, tab in enumerate(all_tabs, 1):
+        print(f"{idx}: {tab}")
+    while True:
+        try:
+            tab_idx = int(input(f"Select a tab by number (1-{len(all_tabs)}): ")) - 1
+            assert 0 <= tab_idx < len(all_tabs)
+            return all_tabs[tab_idx]
+        except (ValueError, AssertionError):
+            print("Invalid selection. Please try again.")
+
+VALIDATE_COLUMNS = ["URL", "Title", "User", "date", "duration"]
+
+def get_sheet(cfg, scoped=True):
+    """Return (worksheet, rows, all_urls) for the configured tab, prompting for a tab if needed.
+
+    When `scoped`, rows outside this researcher's unprocessed set are None and `all_urls`
+    holds the whole URL column for duplicate checks; otherwise `all_urls` is None.
+    """
     scope = [
         "https://spreadsheets.google.com/feeds",
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive.file",
         "https://www.googleapis.com/auth/drive"
     ]
-    creds = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open_by_url(cfg["sheet_url"])
+    client = authorize(CREDENTIALS_PATH, scope)
     worksheet_name = cfg.get("last_tab", "")
 
+    def read(tab):
+        _, sheet, rows, key_values = read_tab_rows(
+            client, cfg["sheet_url"], tab,
+            initials=cfg["initials"] if scoped else None,
+            columns=VALIDATE_COLUMNS,
+            done_statuses=VALIDATE_DONE,
+            key_columns=["URL"]
+        )
+        return sheet, rows, (key_values or {}).get("URL")
+
     if worksheet_name:
         try:
-            sheet = spreadsheet.worksheet(worksheet_name)
+            result = read(worksheet_name)
             print(f"✅ Using tab: '{worksheet_name}'")
+            return result
         except gspread.exceptions.WorksheetNotFound:
             print(f"❌ Tab '{worksheet_name}' not found in this Google Sheet.")
-            all_tabs = [ws.title for ws in spreadsheet.worksheets()]
-            print("Available tabs:")
-            for idx, tab in enumerate(all_tabs, 1):
-                print(f"{idx}: {tab}")
-            while True:
-                try:
-                    tab_idx = int(input(f"Select a tab by number (1-{len(all_tabs)}): ")) - 1
-                    assert 0 <= tab_idx < len(all_tabs)
-                    break
-                except (ValueError, AssertionError):
-                    print("Invalid selection. Please try again.")
-            sheet = spreadsheet.get_worksheet(tab_idx)
-            cfg["last_tab"] = all_tabs[tab_idx]
-            with open(USER_CONFIG_PATH, "w") as f:
-                json.dump(cfg, f, indent=2)
-            print(f"✅ Updated 'last_tab' in config to: {cfg['last_tab']}")
     else:
-        all_tabs = [ws.title for ws in spreadsheet.worksheets()]
         print("No tab specified in config.")
-        print("Available tabs:")
-        for idx, tab in enumerate(all_tabs, 1):
-            print(f"{idx}: {tab}")
-        while True:
-            try:
-                tab_idx = int(input(f"Select a tab by number (1-{len(all_tabs)}): ")) - 1
-                assert 0 <= tab_idx < len(all_tabs)
-                break
-            except (ValueError, AssertionError):
-                print("Invalid selection. Please try again.")
-        sheet = spreadsheet.get_worksheet(tab_idx)
-        cfg["last_tab"] = all_tabs[tab_idx]
-        with open(USER_CONFIG_PATH, "w") as f:
-            json.dump(cfg, f, indent=2)
-        print(f"✅ Updated 'last_tab' in config to: {cfg['last_tab']}")
-    return sheet
 
-@log_script
-def main():
-    cfg = load_user_config()
-    if not cfg:
-        return
-    secrets = load_org_secrets()
-    if not secrets or not secrets.get("youtube_api_key"):
-        return
-    api_key = secrets["youtube_api_key"]
+    cfg["last_tab"] = choose_tab(list_tabs(client, cfg["sheet_url"]))
+    result = read(cfg["last_tab"])
+    with open(USER_CONFIG_PATH, "w") as f:
+        json.dump(cfg, f, indent=2)
+    print(f"✅ Updated 'last_tab' in config to: {cfg['last_tab']}")
+    return result
+
+def validate_rows(sheet, rows, api_key, all_urls=None, checkpoint=None):
+    """Flag duplicate IDs and fill YouTube metadata for every data row. Returns summary counts.
 
-    sheet = get_sheet(cfg)
-    rows = sheet.get_all_values()
+    Rows that are None (outside a scoped read) are skipped; pass `all_urls` (the URL column
+    from row 2 down) so duplicates are still checked against the whole tab. With a
+    `checkpoint` (sheet_checkpoint.RunCheckpoint), rows it already completed are skipped
+    and progress is saved as the run goes.
+    """
     header = rows[0]
     data_rows = rows[1:]
 
     col_map = {name: idx for idx, name in enumerate(header)}
     must_have = ["URL", "Title", "User", "date", "duration", "Researcher Notes"]
 
-    rows_scanned = len(data_rows)
+    rows_scanned = sum(1 for row in data_rows if row is not None)
     cells_updated = 0
+    rows_resumed = 0
     columns_added = []
 
     # Add missing columns
@@ -201,39 +219,65 @@ def main():
             columns_added.append(col)
             # Optionally: Add column with API if you want automatic add
 
-    youtube_id_map = {}
-    for i, row in enumerate(data_rows):
-        url = row[col_map["URL"]]
-        yt_id = extract_youtube_id(url)
-        if yt_id:
-            youtube_id_map.setdefault(yt_id, []).append(i+2)
+    write_buffer = open_write_buffer((sheet, header))
+    if checkpoint is not None:
+        checkpoint.restore_pending(write_buffer, rows)
+    if all_urls is None:
+        all_urls = [row[col_map["URL"]] if row is not None else "" for row in data_rows]
+    youtube_id_map = duplicate_id_rows(all_urls)
 
-    for i, row in enumerate(data_rows):
-        row_num = i + 2
-        url = row[col_map["URL"]]
-        yt_id = extract_youtube_id(url)
-        if not url or row[col_map["Title"]].startswith("If clip ID is found"):
-            continue
+    try:
+        for i, row in enumerate(data_rows):
+            if row is None:
+                continue
+            row_num = i + 2
+            url = row[col_map["URL"]]
+            yt_id = extract_youtube_id(url)
+            if not url or row[col_map["Title"]].startswith("If clip ID is found"):
+                continue
+            key = row_key(url)
+            if checkpoint is not None and checkpoint.take_resumed(key):
+                rows_resumed += 1
+                continue
 
-        if yt_id and len(youtube_id_map[yt_id]) > 1:
-            sheet.format(f"{chr(65+col_map['URL'])}{row_num}", {"backgroundColor": {"red": 1, "green": 0.8, "blue": 0}})
-            logprint(
-                f"⛔ Duplicate ID in row {row_num} (also in rows: {', '.join(map(str, youtube_id_map[yt_id]))})",
-                action="duplicate_found",
-                status="warning",
-                sheet_row=row_num,
-                extra_info={"yt_id": yt_id, "rows": youtube_id_map[yt_id]}
-            )
-        else:
-            sheet.format(f"{chr(65+col_map['URL'])}{row_num}", {"backgroundColor": {"red": 1, "green": 1, "blue": 1}})
+            if yt_id and len(youtube_id_map[yt_id]) > 1:
+                sheet.format(f"{chr(65+col_map['URL'])}{row_num}", DUPLICATE_FORMAT)
+                logprint(
+                    f"⛔ Duplicate ID in row {row_num} (also in rows: {', '.join(map(str, youtube_id_map[yt_id]))})",
+                    action="duplicate_found",
+                    status="warning",
+                    sheet_row=row_num,
+                    extra_info={"yt_id": yt_id, "rows": youtube_id_map[yt_id]}
+                )
+            else:
+                sheet.format(f"{chr(65+col_map['URL'])}{row_num}", CLEAR_FORMAT)
 
-        if yt_id and api_key:
-            meta = fetch_youtube_metadata(yt_id, api_key)
-            if meta:
-                sheet.update_cell(row_num, col_map["Title"]+1, meta["title"]);      cells_updated += 1
-                sheet.update_cell(row_num, col_map["User"]+1, meta["channel"]);    cells_updated += 1
-                sheet.update_cell(row_num, col_map["date"]+1, meta["publishedAt"]);cells_updated += 1
-                sheet.update_cell(row_num, col_map["duration"]+1, meta["duration"]);cells_updated += 1
+            meta = None
+            if yt_id and api_key:
+                meta = checkpoint.metadata_for(key) if checkpoint is not None else None
+                meta = meta or fetch_youtube_metadata(yt_id, api_key)
+                if meta:
+                    write_buffer.set_row(row_num, {
+                        "Title": meta["title"],
+                        "User": meta["channel"],
+                        "date": meta["publishedAt"],
+                        "duration": meta["duration"]
+                    })
+                    cells_updated += 4
+            if checkpoint is not None:
+                checkpoint.mark_done(row_num, key, meta)
+                checkpoint.maybe_save(write_buffer)
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.save(write_buffer)
+            print("💾 Progress saved; run again with --resume to continue.")
+        raise
+    finally:
+        write_buffer.close()
+    if checkpoint is not None:
+        checkpoint.finish(write_buffer)
+    if rows_resumed:
+        print(f"⏭️ Skipped {rows_resumed} row(s) completed before the interruption.")
 
     # --- Summary log ---
     logprint(
@@ -246,6 +290,38 @@ def main():
             "columns_added": columns_added
         }
     )
+    return {
+        "rows_scanned": rows_scanned,
+        "cells_updated": cells_updated,
+        "columns_added": columns_added,
+        "rows_resumed": rows_resumed
+    }
+
+@log_script
+def main(scoped=True, resume=False):
+    daemon_result = request_if_running("validate", scoped=scoped, resume=resume)
+    if daemon_result is not None:
+        print_daemon_result(daemon_result)
+        return
+
+    cfg = load_user_config()
+    if not cfg:
+        return
+    secrets = load_org_secrets()
+    if not secrets or not secrets.get("youtube_api_key"):
+        return
+    api_key = secrets["youtube_api_key"]
+
+    sheet, rows, all_urls = get_sheet(cfg, scoped=scoped)
+    if sheet is None:
+        logprint(
+            "❌ Sheet is unreachable; validation needs a live connection.",
+            action="sheet_unreachable",
+            status="error"
+        )
+        return
+    checkpoint = RunCheckpoint("validate", sheet.spreadsheet_id, sheet.title).start(resume)
+    validate_rows(sheet, rows, api_key, all_urls=all_urls, checkpoint=checkpoint)
 
 if __name__ == "__main__":
     main()
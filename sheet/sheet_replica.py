@@ -0,0 +1,326 @@
+"""Local SQLite replica of the working Sheet tabs.
+
+Full-tab reads (sheet_tools, the validator, the downloader with --all, the daemon)
+serve rows from the replica. Scoped reads go to the Sheet directly and are merged
+into the replica afterwards, so status queries, the offline fallback and saved
+writes still find the rows. A sync first asks Drive for the spreadsheet's modifiedTime; if it has
+not moved since the last sync nothing is read, otherwise the tab is read once and
+only changed rows are written to the replica. If the Sheet cannot be reached the
+last synced rows are served, so status queries keep working offline.
+
+Writes go back through SheetWriteBuffer, which patches the replica immediately and
+sends batched updates to the Sheet. Patches that could not be sent are kept in the
+replica with their row's YouTube ID and column name, and replayed by the next buffer
+on the same tab on whichever row and column now hold them.
+"""
+import os
+import json
+import sqlite3
+import threading
+import time
+import gspread
+from gspread.utils import extract_id_from_url
+from sheet.sheet_cache import CACHE_DIR, open_worksheet, invalidate_sheet_metadata, remember_header
+
+REPLICA_PATH = os.path.join(CACHE_DIR, "replica.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tabs (
+    spreadsheet_id TEXT NOT NULL,
+    tab TEXT NOT NULL,
+    header TEXT NOT NULL,
+    revision TEXT,
+    synced_at REAL,
+    PRIMARY KEY (spreadsheet_id, tab)
+);
+CREATE TABLE IF NOT EXISTS rows (
+    spreadsheet_id TEXT NOT NULL,
+    tab TEXT NOT NULL,
+    row_num INTEGER NOT NULL,
+    row_id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (spreadsheet_id, tab, row_num)
+);
+CREATE TABLE IF NOT EXISTS pending_patches (
+    spreadsheet_id TEXT NOT NULL,
+    tab TEXT NOT NULL,
+    row_num INTEGER NOT NULL,
+    row_id TEXT,
+    colname TEXT NOT NULL,
+    value TEXT,
+    queued_at REAL,
+    PRIMARY KEY (spreadsheet_id, tab, row_num, colname)
+);
+"""
+
+def _row_id(row, header):
+    """Stable identity for a row: its YouTube ID when it has one."""
+    from sheet.sheet_metadata_validator import extract_youtube_id
+    if "URL" in header:
+        idx = header.index("URL")
+        if idx < len(row):
+            return extract_youtube_id(row[idx])
+    return None
+
+class SheetReplica:
+    """Replica of one tab (spreadsheet ID + tab title)."""
+
+    def __init__(self, spreadsheet_id, tab, db_path=REPLICA_PATH):
+        self.spreadsheet_id = spreadsheet_id
+        self.tab = tab
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(pending_patches)")]
+        if columns and "row_id" not in columns:
+            # Patches saved by position only cannot be re-targeted safely; drop them.
+            self.db.execute("DROP TABLE pending_patches")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _key(self):
+        return (self.spreadsheet_id, self.tab)
+
+    def state(self):
+        """Return (header, revision, synced_at) or (None, None, None) if never synced."""
+        with self._lock:
+            cur = self.db.execute(
+                "SELECT header, revision, synced_at FROM tabs WHERE spreadsheet_id=? AND tab=?", self._key()
+            ).fetchone()
+        if not cur:
+            return None, None, None
+        return json.loads(cur[0]), cur[1], cur[2]
+
+    def sync(self, worksheet, force=False):
+        """Bring the replica up to date. Returns {"read": bool, "changed": n, "removed": n}."""
+        _, last_revision, _ = self.state()
+        try:
+            revision = worksheet.client.get_file_drive_metadata(worksheet.spreadsheet_id).get("modifiedTime")
+        except Exception:
+            revision = None  # no Drive access: fall back to reading and diffing
+        if not force and revision and revision == last_revision:
+            with self._lock, self.db:
+                self.db.execute(
+                    "UPDATE tabs SET synced_at=? WHERE spreadsheet_id=? AND tab=?", (time.time(),) + self._key()
+                )
+            return {"read": False, "changed": 0, "removed": 0}
+
+        values = worksheet.get_all_values()
+        return self.load(values, revision)
+
+    def load(self, values, revision=None):
+        """Store a full read of the tab, writing only rows that changed."""
+        header = values[0] if values else []
+        with self._lock:
+            existing = dict(self.db.execute(
+                "SELECT row_num, data FROM rows WHERE spreadsheet_id=? AND tab=?", self._key()
+            ).fetchall())
+            changed = []
+            for row_num, row in enumerate(values[1:], start=2):
+                data = json.dumps(row)
+                if existing.get(row_num) != data:
+                    changed.append(self._key() + (row_num, _row_id(row, header), data))
+            last_row = len(values)
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO rows (spreadsheet_id, tab, row_num, row_id, data) VALUES (?, ?, ?, ?, ?)",
+                    changed
+                )
+                removed = self.db.execute(
+                    "DELETE FROM rows WHERE spreadsheet_id=? AND tab=? AND row_num>?", self._key() + (last_row,)
+                ).rowcount
+                self.db.execute(
+                    "INSERT OR REPLACE INTO tabs (spreadsheet_id, tab, header, revision, synced_at) VALUES (?, ?, ?, ?, ?)",
+                    self._key() + (json.dumps(header), revision, time.time())
+                )
+        return {"read": True, "changed": len(changed), "removed": removed}
+
+    def merge_scoped(self, rows, key_values, columns):
+        """Fold a scoped read (sheet_scope.read_scoped_rows) into the replica.
+
+        Key columns are stored for every row and `columns` for the rows that were read;
+        other cells keep their last synced value (or stay blank), and each row's YouTube ID
+        is recomputed. The revision is cleared so the next full sync re-reads the tab
+        instead of trusting partly filled rows.
+        """
+        header = rows[0]
+        stored_header, _, _ = self.state()
+        with self._lock:
+            existing = {}
+            if stored_header == header:
+                existing = dict(self.db.execute(
+                    "SELECT row_num, data FROM rows WHERE spreadsheet_id=? AND tab=?", self._key()
+                ).fetchall())
+            changed = []
+            for row_num in range(2, len(rows) + 1):
+                row = json.loads(existing[row_num]) if row_num in existing else []
+                row.extend([""] * (len(header) - len(row)))
+                for colname, values in key_values.items():
+                    row[header.index(colname)] = values[row_num - 2] if row_num - 2 < len(values) else ""
+                scoped = rows[row_num - 1]
+                if scoped is not None:
+                    for colname in columns:
+                        idx = header.index(colname)
+                        row[idx] = scoped[idx] if idx < len(scoped) else ""
+                data = json.dumps(row)
+                if existing.get(row_num) != data:
+                    changed.append(self._key() + (row_num, _row_id(row, header), data))
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO rows (spreadsheet_id, tab, row_num, row_id, data) VALUES (?, ?, ?, ?, ?)",
+                    changed
+                )
+                self.db.execute(
+                    "DELETE FROM rows WHERE spreadsheet_id=? AND tab=? AND row_num>?", self._key() + (len(rows),)
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO tabs (spreadsheet_id, tab, header, revision, synced_at) VALUES (?, ?, ?, ?, ?)",
+                    self._key() + (json.dumps(header), None, time.time())
+                )
+        return len(changed)
+
+    def rows(self):
+        """Return the tab as get_all_values() would: header first, then every row in order."""
+        header, _, _ = self.state()
+        if header is None:
+            return []
+        with self._lock:
+            data = self.db.execute(
+                "SELECT row_num, data FROM rows WHERE spreadsheet_id=? AND tab=? ORDER BY row_num", self._key()
+            ).fetchall()
+        rows = [header]
+        for row_num, row in data:
+            while len(rows) < row_num - 1:
+                rows.append([""] * len(header))
+            rows.append(json.loads(row))
+        return rows
+
+    def apply_patch(self, row_num, col, value):
+        """Apply a local cell write (0-based col) so replica reads see it before the Sheet does."""
+        with self._lock:
+            cur = self.db.execute(
+                "SELECT data FROM rows WHERE spreadsheet_id=? AND tab=? AND row_num=?", self._key() + (row_num,)
+            ).fetchone()
+            if not cur:
+                return
+            row = json.loads(cur[0])
+            row.extend([""] * (col + 1 - len(row)))
+            row[col] = value
+            with self.db:
+                self.db.execute(
+                    "UPDATE rows SET data=? WHERE spreadsheet_id=? AND tab=? AND row_num=?",
+                    (json.dumps(row),) + self._key() + (row_num,)
+                )
+
+    def add_header_column(self, colname):
+        header, revision, synced_at = self.state()
+        if header is not None and colname not in header:
+            with self._lock, self.db:
+                self.db.execute(
+                    "UPDATE tabs SET header=? WHERE spreadsheet_id=? AND tab=?", (json.dumps(header + [colname]),) + self._key()
+                )
+
+    def save_pending(self, pending, header):
+        """Persist {(row, 0-based col): value} patches that could not be sent to the Sheet.
+
+        Each patch is stored with its row's YouTube ID and its column name so take_pending
+        can find them again after rows or columns were inserted, deleted or sorted. Returns
+        the number of patches on rows without a known ID, which can only be replayed by position.
+        """
+        with self._lock, self.db:
+            row_ids = dict(self.db.execute(
+                "SELECT row_num, row_id FROM rows WHERE spreadsheet_id=? AND tab=?", self._key()
+            ).fetchall())
+            self.db.executemany(
+                "INSERT OR REPLACE INTO pending_patches (spreadsheet_id, tab, row_num, row_id, colname, value, queued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    self._key() + (row, row_ids.get(row), header[col], value, time.time())
+                    for (row, col), value in pending.items() if col < len(header)
+                ]
+            )
+        return sum(1 for (row, col) in pending if col < len(header) and not row_ids.get(row))
+
+    def take_pending(self):
+        """Remove and return persisted patches as {(row, colname): value}, re-targeted by YouTube ID.
+
+        A patch stays on its row if that row still holds its ID, follows the ID if it now
+        sits on exactly one other row, and is dropped if the ID is gone or ambiguous. A patch
+        saved without an ID (its row was not in the replica) is replayed on its row number.
+        """
+        with self._lock, self.db:
+            patches = self.db.execute(
+                "SELECT row_num, row_id, colname, value FROM pending_patches WHERE spreadsheet_id=? AND tab=?", self._key()
+            ).fetchall()
+            self.db.execute("DELETE FROM pending_patches WHERE spreadsheet_id=? AND tab=?", self._key())
+            rows_by_id = {}
+            for row_num, row_id in self.db.execute(
+                "SELECT row_num, row_id FROM rows WHERE spreadsheet_id=? AND tab=? AND row_id IS NOT NULL", self._key()
+            ):
+                rows_by_id.setdefault(row_id, []).append(row_num)
+        result = {}
+        dropped = by_position = 0
+        for row_num, row_id, colname, value in patches:
+            if not row_id:
+                by_position += 1
+                result[(row_num, colname)] = value
+                continue
+            matches = rows_by_id.get(row_id, [])
+            if row_num not in matches:
+                row_num = matches[0] if len(matches) == 1 else None
+            if row_num is None:
+                dropped += 1
+                continue
+            result[(row_num, colname)] = value
+        if dropped:
+            print(f"⚠️ Dropped {dropped} saved Sheet update(s) whose row no longer matches a single YouTube ID.")
+        if by_position:
+            print(f"⚠️ Replaying {by_position} saved Sheet update(s) by row number; their rows had no known YouTube ID.")
+        return result
+
+    def status_counts(self, status_colname="Status"):
+        """Count rows per Status value, straight from the replica (works offline)."""
+        rows = self.rows()
+        if not rows or status_colname not in rows[0]:
+            return {}
+        idx = rows[0].index(status_colname)
+        counts = {}
+        for row in rows[1:]:
+            status = row[idx] if idx < len(row) else ""
+            counts[status or "(blank)"] = counts.get(status or "(blank)", 0) + 1
+        return counts
+
+def replica_for(worksheet):
+    return SheetReplica(worksheet.spreadsheet_id, worksheet.title)
+
+def read_replica_rows(client, sheet_url, tab_title, force=False):
+    """Open the tab, sync its replica and return (spreadsheet, worksheet, rows, replica).
+
+    Rows come from the replica. If the Sheet cannot be reached but the tab was synced
+    before, the last synced rows are returned with a warning (spreadsheet/worksheet are
+    None unless their metadata is cached).
+    """
+    replica = SheetReplica(extract_id_from_url(sheet_url), tab_title)
+    spreadsheet = worksheet = None
+    try:
+        spreadsheet, worksheet = open_worksheet(client, sheet_url, tab_title)
+        try:
+            delta = replica.sync(worksheet, force=force)
+        except gspread.exceptions.APIError:
+            # Cached metadata may be stale (tab renamed/recreated): refetch once.
+            invalidate_sheet_metadata(sheet_url)
+            spreadsheet, worksheet = open_worksheet(client, sheet_url, tab_title)
+            delta = replica.sync(worksheet, force=True)
+    except gspread.exceptions.WorksheetNotFound:
+        raise
+    except Exception as e:
+        header, _, synced_at = replica.state()
+        if header is None:
+            raise
+        age = int(time.time() - synced_at)
+        print(f"⚠️ Sheet unreachable ({e}); using local replica synced {age}s ago.")
+        return spreadsheet, worksheet, replica.rows(), replica
+    if delta["read"]:
+        print(f"🔄 Replica synced: {delta['changed']} row(s) changed, {delta['removed']} removed.")
+    rows = replica.rows()
+    remember_header(sheet_url, tab_title, rows[0] if rows else [])
+    return spreadsheet, worksheet, rows, replica
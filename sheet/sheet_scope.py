@@ -0,0 +1,168 @@
+"""Researcher-scoped row selection.
+
+Batch/catch-up mode only processes rows assigned to the current researcher. Instead
+of downloading the whole tab, read_scoped_rows first fetches the Researcher Name and
+Status columns, picks this researcher's unprocessed rows, then fetches only the
+columns a workflow needs for those rows, grouped into contiguous ranges.
+
+Scoped rows are returned in get_all_values() shape with None for rows outside the
+scope, so the row loops only need to skip None. read_tab_rows also merges them into
+the local replica, so writes queued on them can be saved and replayed by YouTube ID.
+"""
+import re
+import gspread
+from gspread.utils import rowcol_to_a1
+from sheet.sheet_cache import cached_header, open_worksheet, remember_header
+from sheet.sheet_replica import read_replica_rows, replica_for
+
+RESEARCHER_COLNAME = "Researcher Name"
+STATUS_COLNAME = "Status"
+MAX_RANGES_PER_REQUEST = 100
+
+# Status prefixes that mean a row is already handled by each workflow.
+VALIDATE_DONE = ("Queued", "Downloading", "Downloaded", "Renamed")
+DOWNLOAD_DONE = ("Queued", "Downloading", "Downloaded", "Renamed")
+RENAME_DONE = ("Renamed",)
+
+def initials_match(cell, initials):
+    """True if `initials` is one of the (possibly merged, e.g. pm_ms) initials in the cell."""
+    parts = [p for p in re.split(r"[_\s,/&+]+", str(cell).strip().lower()) if p]
+    return initials.strip().lower() in parts
+
+def is_done(status, done_statuses):
+    return bool(status) and str(status).startswith(tuple(done_statuses))
+
+def _col_letter(col_idx):
+    return re.sub(r"\d", "", rowcol_to_a1(1, col_idx + 1))
+
+def _runs(row_nums):
+    """Group sorted row numbers into contiguous (start, end) runs."""
+    runs = []
+    for row_num in row_nums:
+        if runs and row_num == runs[-1][1] + 1:
+            runs[-1][1] = row_num
+        else:
+            runs.append([row_num, row_num])
+    return [tuple(run) for run in runs]
+
+def _read_key_columns(worksheet, header, colnames):
+    """Fetch whole columns (header cell included) in one call. Returns {colname: [row2, row3, ...]} or None on header drift."""
+    present = [c for c in colnames if c in header]
+    ranges = [f"{_col_letter(header.index(c))}1:{_col_letter(header.index(c))}" for c in present]
+    results = worksheet.batch_get(ranges, major_dimension="COLUMNS")
+    columns = {}
+    for colname, value_range in zip(present, results):
+        values = value_range[0] if value_range else []
+        if not values or values[0] != colname:
+            return None
+        columns[colname] = values[1:]
+    return columns
+
+def select_rows(researchers, statuses, initials, done_statuses):
+    """Row numbers (2-based) assigned to `initials` and not yet done."""
+    selected = []
+    for i, researcher in enumerate(researchers):
+        status = statuses[i] if i < len(statuses) else ""
+        if initials_match(researcher, initials) and not is_done(status, done_statuses):
+            selected.append(i + 2)
+    return selected
+
+def read_scoped_rows(worksheet, sheet_url, initials, columns, done_statuses, key_columns=()):
+    """Read only this researcher's unprocessed rows.
+
+    Returns (rows, key_values) where rows is get_all_values()-shaped with None outside
+    the scope, and key_values maps each fetched key column to its full list of values
+    (row 2 onwards). Returns None if the tab has no Researcher Name column.
+    """
+    header = cached_header(sheet_url, worksheet.title) or worksheet.row_values(1)
+    key_names = [RESEARCHER_COLNAME, STATUS_COLNAME] + [c for c in key_columns if c not in (RESEARCHER_COLNAME, STATUS_COLNAME)]
+    if RESEARCHER_COLNAME not in header:
+        header = worksheet.row_values(1)
+        if RESEARCHER_COLNAME not in header:
+            return None
+    key_values = _read_key_columns(worksheet, header, key_names)
+    if key_values is None:
+        # Cached header is out of date: re-read it once.
+        header = worksheet.row_values(1)
+        if RESEARCHER_COLNAME not in header:
+            return None
+        key_values = _read_key_columns(worksheet, header, key_names)
+    remember_header(sheet_url, worksheet.title, header)
+
+    researchers = key_values[RESEARCHER_COLNAME]
+    statuses = key_values.get(STATUS_COLNAME, [])
+    n_rows = max([len(v) for v in key_values.values()] + [0]) + 1
+    rows = [header] + [None] * (n_rows - 1)
+    selected = select_rows(researchers, statuses, initials, done_statuses)
+
+    col_idx = [header.index(c) for c in columns if c in header]
+    if selected and col_idx:
+        first, last = min(col_idx), max(col_idx)
+        runs = _runs(selected)
+        for chunk_start in range(0, len(runs), MAX_RANGES_PER_REQUEST):
+            chunk = runs[chunk_start:chunk_start + MAX_RANGES_PER_REQUEST]
+            ranges = [f"{_col_letter(first)}{start}:{_col_letter(last)}{end}" for start, end in chunk]
+            for (start, end), value_range in zip(chunk, worksheet.batch_get(ranges)):
+                for offset, row_num in enumerate(range(start, end + 1)):
+                    values = value_range[offset] if offset < len(value_range) else []
+                    row = [""] * len(header)
+                    row[first:first + len(values)] = values
+                    rows[row_num - 1] = row[:len(header)]
+    for row_num in selected:
+        if rows[row_num - 1] is None:
+            rows[row_num - 1] = [""] * len(header)
+    for row_num in selected:
+        for colname, values in key_values.items():
+            idx = header.index(colname)
+            if row_num - 2 < len(values):
+                rows[row_num - 1][idx] = values[row_num - 2]
+
+    print(f"🎯 {len(selected)} unprocessed row(s) for '{initials}' out of {n_rows - 1}.")
+    return rows, key_values
+
+def scope_rows(rows, initials, done_statuses):
+    """Apply the same scope to an already-read tab (e.g. the offline replica)."""
+    header = rows[0]
+    if RESEARCHER_COLNAME not in header:
+        return rows
+    r_idx = header.index(RESEARCHER_COLNAME)
+    s_idx = header.index(STATUS_COLNAME) if STATUS_COLNAME in header else None
+    scoped = [header]
+    for row in rows[1:]:
+        researcher = row[r_idx] if r_idx < len(row) else ""
+        status = row[s_idx] if s_idx is not None and s_idx < len(row) else ""
+        keep = initials_match(researcher, initials) and not is_done(status, done_statuses)
+        scoped.append(row if keep else None)
+    return scoped
+
+def read_tab_rows(client, sheet_url, tab_title, initials=None, columns=(), done_statuses=(), key_columns=()):
+    """Rows for a workflow: scoped to `initials` when given, otherwise the full tab from the replica.
+
+    Returns (spreadsheet, worksheet, rows, key_values); key_values is None for unscoped reads.
+    Falls back to the (possibly offline) replica, scoped locally, if the scoped read fails.
+    """
+    if initials:
+        try:
+            spreadsheet, worksheet = open_worksheet(client, sheet_url, tab_title)
+            scoped = read_scoped_rows(worksheet, sheet_url, initials, columns, done_statuses, key_columns)
+            if scoped is not None:
+                rows, key_values = scoped
+                header = rows[0]
+                col_idx = [header.index(c) for c in columns if c in header]
+                fetched = header[min(col_idx):max(col_idx) + 1] if col_idx else []  # one contiguous range per run
+                replica_for(worksheet).merge_scoped(rows, key_values, fetched)
+                return spreadsheet, worksheet, rows, key_values
+            print(f"⚠️ No '{RESEARCHER_COLNAME}' column; processing the whole tab.")
+        except gspread.exceptions.WorksheetNotFound:
+            raise
+        except Exception as e:
+            print(f"⚠️ Scoped read failed ({e}); falling back to the local replica.")
+    spreadsheet, worksheet, rows, _ = read_replica_rows(client, sheet_url, tab_title)
+    if not initials or not rows:
+        return spreadsheet, worksheet, rows, None
+    header = rows[0]
+    key_values = {
+        colname: [row[header.index(colname)] if header.index(colname) < len(row) else "" for row in rows[1:]]
+        for colname in key_columns if colname in header
+    }
+    return spreadsheet, worksheet, scope_rows(rows, initials, done_statuses), key_values
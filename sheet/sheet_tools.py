@@ -1,18 +1,42 @@
-import gspread
-from google.oauth2.service_account import Credentials
+import atexit
+import threading
+import time
+from gspread.utils import rowcol_to_a1
+from sheet.sheet_cache import authorize
+from sheet.sheet_replica import replica_for
+from sheet.sheet_scope import read_tab_rows, RENAME_DONE
 
-def get_sheet(cfg, service_account_path):
-    """Return (worksheet, header, col_map, all_rows)."""
-    creds = Credentials.from_service_account_file(service_account_path, scopes=[
+# Columns get_metadata_by_title reads, fetched for scoped reads.
+METADATA_COLUMNS = ["URL", "Title", "User", "Job Number", "resolution", "Researcher Name", "Status"]
+
+def get_sheet(cfg, service_account_path, scoped=False):
+    """Return (worksheet, header, col_map, all_rows).
+
+    With `scoped`, only this researcher's rows that are not yet renamed are read; the
+    other entries of all_rows are None.
+    """
+    client = authorize(service_account_path, [
         "https://spreadsheets.google.com/feeds",
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive.file",
         "https://www.googleapis.com/auth/drive"
     ])
-    client = gspread.authorize(creds)
-    sheet = client.open_by_url(cfg["sheet_url"])
-    worksheet = sheet.worksheet(cfg["last_tab"])
-    rows = worksheet.get_all_values()
+    sheet, worksheet, rows, _ = read_tab_rows(
+        client, cfg["sheet_url"], cfg["last_tab"],
+        initials=cfg.get("initials") if scoped else None,
+        columns=METADATA_COLUMNS,
+        done_statuses=RENAME_DONE
+    )
+    header = rows[0]
+    col_map = {key: idx for idx, key in enumerate(header)}
+    return worksheet, header, col_map, rows
+
+def refresh_sheet_data(sheet_data):
+    """Re-sync the replica of an already-open worksheet (no re-auth). Returns a new sheet_data tuple."""
+    worksheet = sheet_data[0]
+    replica = replica_for(worksheet)
+    replica.sync(worksheet)
+    rows = replica.rows()
     header = rows[0]
     col_map = {key: idx for idx, key in enumerate(header)}
     return worksheet, header, col_map, rows
@@ -22,35 +46,195 @@ def ensure_column(worksheet, header, colname):
     if colname in header:
         return header.index(colname)
     worksheet.update_cell(1, len(header) + 1, colname)
-    return len(header)  # 0-based index
+    header.append(colname)  # keep callers' header in sync so the column is only added once
+    return len(header) - 1  # 0-based index
 
 def normalize(s):
     return ''.join(c.lower() for c in str(s) if c.isalnum())
 
-def update_status_by_title(cfg, service_account_path, title, status, status_colname="Status"):
-    worksheet, header, col_map, rows = get_sheet(cfg, service_account_path)
-    status_col = ensure_column(worksheet, header, status_colname)
+class SheetWriteBuffer:
+    """Write-behind queue for high-volume, low-urgency cell updates (status, filename, completion time).
+
+    Updates are coalesced per cell (last write wins) and sent as one batch_update every
+    `flush_interval` seconds or once `flush_every` cells are pending, and again at shutdown.
+    Flushing happens on a background thread; failed batches are merged back and retried
+    with backoff, so callers never block on the Sheets API. With a `replica`, every update
+    is applied to it immediately, and anything still unsent at close is kept there (by
+    YouTube ID and column name) and replayed by the next buffer on the same tab.
+    """
+
+    def __init__(self, worksheet, header, flush_every=25, flush_interval=10, max_backoff=300, replica=None):
+        self.worksheet = worksheet
+        self.header = header
+        self.replica = replica
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.pending = {}  # (row, 0-based col) -> value
+        self._sending = {}  # batch currently being sent
+        self.cells_written = 0
+        self.failures = 0
+        self._columns = {}
+        if replica is not None:
+            for (row, colname), value in replica.take_pending().items():
+                col = self.column(colname)
+                replica.apply_patch(row, col, value)
+                self.pending[(row, col)] = value
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sheet-write-buffer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def column(self, colname):
+        """Return the 0-based index of `colname`, adding the header cell the first time only."""
+        if colname not in self._columns:
+            self._columns[colname] = ensure_column(self.worksheet, self.header, colname)
+            if self.replica is not None:
+                self.replica.add_header_column(colname)
+        return self._columns[colname]
+
+    def set(self, row, colname, value):
+        """Queue `value` for (row, colname). Returns immediately."""
+        col = self.column(colname)
+        if self.replica is not None:
+            self.replica.apply_patch(row, col, value)
+        with self._lock:
+            self.pending[(row, col)] = value
+            full = len(self.pending) >= self.flush_every
+        if full and not self.failures:  # while failing, the backoff in _run decides when to retry
+            self._wake.set()
+
+    def set_row(self, row, values):
+        """Queue several {colname: value} updates for one row."""
+        for colname, value in values.items():
+            self.set(row, colname, value)
+
+    def flush(self):
+        """Send all pending cells as one batch. Returns True on success (or nothing to send)."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self.pending
+                self.pending = {}
+                self._sending = batch
+            if not batch:
+                return True
+            data = [
+                {"range": rowcol_to_a1(row, col + 1), "values": [[value]]}
+                for (row, col), value in sorted(batch.items())
+            ]
+            try:
+                self.worksheet.batch_update(data, raw=False)
+            except Exception as e:
+                with self._lock:
+                    # Anything queued while we were sending is newer, so it wins.
+                    for key, value in batch.items():
+                        self.pending.setdefault(key, value)
+                    self._sending = {}
+                self.failures += 1
+                print(f"⚠️ Sheet batch write failed ({len(batch)} cells, attempt {self.failures}): {e}")
+                return False
+            with self._lock:
+                self._sending = {}
+            self.failures = 0
+            self.cells_written += len(batch)
+            print(f"📝 Wrote {len(batch)} queued cell(s) to the Sheet.")
+            return True
+
+    def snapshot(self):
+        """Unconfirmed updates (queued or being sent) as {(row, colname): value}, e.g. for checkpoints."""
+        with self._lock:
+            cells = dict(self._sending)
+            cells.update(self.pending)
+        return {(row, self.header[col] if col < len(self.header) else col): value for (row, col), value in cells.items()}
+
+    def _run(self):
+        while not self._stopped.is_set():
+            delay = self.flush_interval
+            if self.failures:
+                delay = min(self.flush_interval * 2 ** self.failures, self.max_backoff)
+            self._wake.wait(delay)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.flush()
+
+    def close(self, retries=3):
+        """Stop the background thread and flush what is left."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        atexit.unregister(self.close)  # don't keep the worksheet and replica alive until exit
+        self._wake.set()
+        self._thread.join(timeout=5)
+        for attempt in range(retries):
+            if self.flush():
+                return
+            time.sleep(2 ** attempt)
+        if self.replica is not None:
+            by_position = self.replica.save_pending(self.pending, self.header)
+            print(f"⚠️ {len(self.pending)} queued Sheet update(s) kept in the local replica for the next run.")
+            if by_position:
+                print(
+                    f"⚠️ {by_position} of them are on rows without a known YouTube ID and will be replayed "
+                    "by row number; check those rows if the tab is edited before the next run."
+                )
+        else:
+            print(f"❌ {len(self.pending)} queued Sheet update(s) could not be written.")
+
+def open_write_buffer(sheet_data, **kwargs):
+    """Return a SheetWriteBuffer for a get_sheet tuple, backed by the tab's local replica."""
+    worksheet, header = sheet_data[0], sheet_data[1]
+    return SheetWriteBuffer(worksheet, header, replica=replica_for(worksheet), **kwargs)
+
+def find_row_by_title(rows, col_map, title):
+    """Return the sheet row number (1-based, header is row 1) whose Title matches, or None."""
     title_col = col_map.get("Title")
     if title_col is None:
         raise Exception("No 'Title' column found in sheet.")
-
     for idx, row in enumerate(rows[1:], start=2):
-        sheet_title = row[title_col]
-        if normalize(sheet_title) == normalize(title):
-            worksheet.update_cell(idx, status_col + 1, status)
+        if row is not None and normalize(row[title_col]) == normalize(title):
+            return idx
+    return None
+
+def update_status_by_title(cfg, service_account_path, title, status, status_colname="Status", sheet_data=None,
+                           write_buffer=None, extra_fields=None):
+    """Write `status` (plus optional {colname: value} `extra_fields`) on the row matching the title.
+
+    Pass `sheet_data` (from get_sheet) to reuse an open sheet, and `write_buffer` to queue the
+    write instead of sending it immediately.
+    """
+    worksheet, header, col_map, rows = sheet_data or get_sheet(cfg, service_account_path)
+    idx = find_row_by_title(rows, col_map, title)
+    if idx is not None:
+        values = {status_colname: status}
+        values.update(extra_fields or {})
+        if write_buffer is not None:
+            write_buffer.set_row(idx, values)
+            print(f"📝 Queued status for row {idx}: {status}")
+        else:
+            for colname, value in values.items():
+                worksheet.update_cell(idx, ensure_column(worksheet, header, colname) + 1, value)
             print(f"📝 Updated status for row {idx}: {status}")
-            return True
+        row = rows[idx - 1]
+        status_col = header.index(status_colname) if status_colname in header else None
+        if status_col is not None and status_col < len(row):
+            row[status_col] = status
+        return True
     print(f"⚠️ Could not find row for title '{title}' to update status.")
     return False
 
-def get_metadata_by_title(cfg, service_account_path, title):
-    """Return metadata dict for the row matching the title."""
-    worksheet, header, col_map, rows = get_sheet(cfg, service_account_path)
+def get_metadata_by_title(cfg, service_account_path, title, sheet_data=None):
+    """Return metadata dict for the row matching the title. Pass `sheet_data` to reuse an open sheet."""
+    worksheet, header, col_map, rows = sheet_data or get_sheet(cfg, service_account_path)
     title_col = col_map.get("Title")
     if title_col is None:
         raise Exception("No 'Title' column found in sheet.")
 
     for row in rows[1:]:
+        if row is None:
+            continue
         sheet_title = row[title_col]
         if normalize(sheet_title) == normalize(title):
             # Adapt field names as needed for your sheet:
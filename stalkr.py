@@ -0,0 +1,298 @@
+"""Single entry point for the Stalkr workflow.
+
+    python stalkr.py setup       # create/complete config/user_config.json
+    python stalkr.py validate    # fill metadata and flag duplicates in the Sheet
+    python stalkr.py download    # send Sheet rows to JDownloader2
+    python stalkr.py pipeline    # validate + download new rows in one overlapped pass
+    python stalkr.py simulate    # try the download scheduler on a fake device
+    python stalkr.py rename      # rename finished downloads once
+    python stalkr.py watch       # keep renaming finished downloads
+    python stalkr.py progress    # live JD throughput/ETA, pushed to the Status column
+    python stalkr.py logs        # show recent log entries
+    python stalkr.py daemon      # keep Sheet/JD clients warm for the commands above
+    python stalkr.py status      # daemon state, or row status counts from the local replica
+    python stalkr.py preflight   # non-interactive connectivity check, all services in parallel
+    python stalkr.py --profile <command>   # profile a run into logs/profiles/
+
+Heavy dependencies (gspread, google-auth, requests, isodate, myjdapi) are only
+imported inside the subcommand that needs them, so `--help`, `logs` and
+`startup-check` stay fast.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGS_DIR = os.path.join(BASE_DIR, "logs")
+
+# Cold-start budget for `import stalkr` in a fresh interpreter (seconds).
+STARTUP_BUDGET_SECONDS = 0.15
+HEAVY_MODULES = ["gspread", "google.oauth2", "requests", "isodate", "myjdapi"]
+
+
+def cmd_setup(args):
+    from setup_user_config import main as setup_main
+    setup_main()
+
+
+def cmd_validate(args):
+    from sheet.sheet_metadata_validator import main as validate_main
+    validate_main(scoped=not args.all, resume=args.resume)
+
+
+def cmd_download(args):
+    from downloader.download_videos import main as download_main
+    download_main(scoped=not args.all, balance=args.balance, schedule=args.schedule, resume=args.resume,
+                  refill_interval=args.refill_interval)
+
+
+def cmd_pipeline(args):
+    from downloader.pipeline import main as pipeline_main
+    pipeline_main(scoped=not args.all, workers=args.workers, balance=args.balance)
+
+
+def cmd_rename(args):
+    from downloader.watch_and_rename import main as rename_main
+    rename_main(scoped=not args.all)
+
+
+def cmd_watch(args):
+    from downloader.watch_and_rename import main as rename_main
+    rename_main(watch=True, interval=args.interval, scoped=not args.all)
+
+
+def cmd_progress(args):
+    from downloader.jd_progress import main as progress_main
+    progress_main(interval=args.interval, once=args.once, scoped=not args.all)
+
+
+def cmd_simulate(args):
+    from utils.jd_simulator import simulate
+    stats = simulate(
+        jobs=args.jobs,
+        urgent_at=args.urgent_at,
+        max_in_flight=args.max_in_flight,
+        max_bandwidth_mbps=args.max_bandwidth,
+        bandwidth_mbps=args.link
+    )
+    wait = f"{stats['urgent_wait']:.0f}s" if stats["urgent_wait"] is not None else "n/a (queue drained first)"
+    print(
+        f"\nSimulated {stats['elapsed']:.0f}s: {stats['done']} done, {stats['preempted']} preempted, "
+        f"urgent job finished {wait} after it was added."
+    )
+
+
+def cmd_daemon(args):
+    from daemon.client import DaemonError, daemon_available, send_request
+    if args.stop:
+        if not daemon_available():
+            print("ℹ️ No stalkr daemon is running.")
+            return 0
+        try:
+            send_request("shutdown", timeout=5)
+        except (ConnectionRefusedError, FileNotFoundError, DaemonError) as e:
+            print(f"❌ Could not stop the daemon: {e}")
+            return 1
+        print("🛑 Stop requested.")
+        return 0
+    from daemon.server import serve
+    serve()
+
+
+def print_replica_status():
+    """Print per-Status row counts for the configured tab from the local replica (works offline)."""
+    from gspread.utils import extract_id_from_url
+    from sheet.sheet_replica import SheetReplica
+    from utils.jd_connection_utils import load_user_config
+
+    cfg = load_user_config(os.path.join(BASE_DIR, "config", "user_config.json"))
+    if not cfg.get("sheet_url") or not cfg.get("last_tab"):
+        print("ℹ️ No sheet configured yet; run `python stalkr.py setup`.")
+        return 1
+    replica = SheetReplica(extract_id_from_url(cfg["sheet_url"]), cfg["last_tab"])
+    _, _, synced_at = replica.state()
+    if synced_at is None:
+        print(f"ℹ️ Tab '{cfg['last_tab']}' has not been synced locally yet.")
+        return 1
+    print(f"📊 Tab '{cfg['last_tab']}' (local replica, synced {int(time.time() - synced_at)}s ago)")
+    for status, count in sorted(replica.status_counts().items()):
+        print(f"  {status}: {count}")
+    return 0
+
+
+def cmd_status(args):
+    from daemon.client import daemon_available, print_daemon_result, send_request
+    if daemon_available():
+        try:
+            print_daemon_result(send_request("status", timeout=5))
+            return 0
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+    print("ℹ️ No stalkr daemon is running; commands run standalone.")
+    return print_replica_status()
+
+
+def cmd_logs(args):
+    import csv
+
+    if not os.path.isdir(LOGS_DIR):
+        print(f"No logs found in {LOGS_DIR}")
+        return 1
+    if args.date:
+        log_name = f"{args.date}.log.csv"
+    else:
+        log_files = sorted(f for f in os.listdir(LOGS_DIR) if f.endswith(".log.csv"))
+        if not log_files:
+            print(f"No logs found in {LOGS_DIR}")
+            return 1
+        log_name = log_files[-1]
+    log_path = os.path.join(LOGS_DIR, log_name)
+    if not os.path.exists(log_path):
+        print(f"No log file at {log_path}")
+        return 1
+
+    with open(log_path, newline="", encoding="utf-8") as f:
+        rows = [
+            row for row in csv.DictReader(f)
+            if (not args.status or row.get("status") == args.status)
+            and (not args.action or row.get("action") == args.action)
+        ]
+    print(f"📄 {log_name} ({len(rows)} matching entries)")
+    for row in rows[-args.lines:]:
+        details = row.get("error_message") or row.get("extra_info") or ""
+        print(f"{row['timestamp']}  {row['status'] or '-':8} {row['action']:24} {details}")
+    return 0
+
+
+def measure_cold_startup():
+    """Return (seconds, heavy_modules_loaded) for `import stalkr` in a fresh interpreter."""
+    probe = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        "import stalkr\n"
+        "stalkr.build_parser()\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps([elapsed, heavy]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    elapsed, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, heavy
+
+
+def cmd_preflight(args):
+    from utils.preflight import print_preflight, run_preflight
+    started = time.perf_counter()
+    report = run_preflight(check_timeout=args.timeout, deadline=args.deadline)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_preflight(report)
+        print(f"⏱️  Pre-flight took {(time.perf_counter() - started) * 1000:.0f} ms")
+    return 0 if all(r["ok"] for r in report) else 1
+
+
+def cmd_startup_check(args):
+    elapsed, heavy = measure_cold_startup()
+    print(f"⏱️  Cold startup: {elapsed * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        return 1
+    if elapsed > args.budget:
+        print("❌ Cold startup is over budget.")
+        return 1
+    print("✅ Cold startup within budget.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="stalkr", description="Stalkr Sheet x JDownloader workflow.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write cProfile stats, sampled stacks and API latency histograms to logs/profiles/.")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    subparsers.add_parser("setup", help="Create or complete the local user config.").set_defaults(func=cmd_setup)
+    validate = subparsers.add_parser("validate", help="Validate and fill YouTube metadata in the Sheet.")
+    validate.set_defaults(func=cmd_validate)
+    download = subparsers.add_parser("download", help="Send Sheet rows to JDownloader2.")
+    spread = download.add_mutually_exclusive_group()
+    spread.add_argument("--balance", dest="balance", action="store_true", default=None,
+                        help="Spread packages across all org JD devices (default: config dispatch_mode).")
+    spread.add_argument("--single", dest="balance", action="store_false",
+                        help="Send every package to this researcher's own device.")
+    download.add_argument("--schedule", action="store_true",
+                          help="Release packages by Priority/Deadline under the max_in_flight/max_bandwidth_mbps caps.")
+    download.add_argument("--refill-interval", type=float, default=None,
+                          help="With --schedule: seconds between Sheet re-reads for new rows (default: config refill_interval_s or 30).")
+    download.set_defaults(func=cmd_download)
+    simulate = subparsers.add_parser("simulate", help="Run the download scheduler against a simulated JD device.")
+    simulate.add_argument("--jobs", type=int, default=20, help="Normal-priority packages to queue (default: 20).")
+    simulate.add_argument("--urgent-at", type=int, default=120, help="Second at which an urgent row arrives (default: 120).")
+    simulate.add_argument("--max-in-flight", type=int, default=3, help="In-flight cap (default: 3).")
+    simulate.add_argument("--max-bandwidth", type=float, default=0, help="Bandwidth cap in MB/s (default: none).")
+    simulate.add_argument("--link", type=float, default=20, help="Simulated link speed in MB/s (default: 20).")
+    simulate.set_defaults(func=cmd_simulate)
+    pipeline = subparsers.add_parser("pipeline", help="Validate and send new rows to JDownloader2 in one streaming pass.")
+    pipeline.add_argument("--workers", type=int, default=8, help="Concurrent YouTube metadata fetches (default: 8).")
+    pipeline.add_argument("--balance", action="store_true", default=None,
+                          help="Spread packages across all org JD devices (default: config dispatch_mode).")
+    pipeline.set_defaults(func=cmd_pipeline)
+    rename = subparsers.add_parser("rename", help="Rename finished downloads and update the Sheet.")
+    rename.set_defaults(func=cmd_rename)
+    watch = subparsers.add_parser("watch", help="Keep renaming finished downloads (Ctrl+C to stop).")
+    watch.add_argument("--interval", type=int, default=60, help="Seconds between scans (default: 60).")
+    watch.set_defaults(func=cmd_watch)
+    progress = subparsers.add_parser("progress", help="Show download throughput/ETA and write it to the Sheet.")
+    progress.add_argument("--interval", type=int, default=15, help="Seconds between polls (default: 15).")
+    progress.add_argument("--once", action="store_true", help="Poll once and exit.")
+    progress.set_defaults(func=cmd_progress)
+    for workflow in (validate, download):
+        workflow.add_argument("--resume", action="store_true", help="Continue an interrupted run from its checkpoint.")
+    for workflow in (validate, download, pipeline, rename, watch, progress):
+        workflow.add_argument("--all", action="store_true", help="Process every row, not just your unprocessed ones.")
+
+    logs = subparsers.add_parser("logs", help="Show recent log entries.")
+    logs.add_argument("-n", "--lines", type=int, default=20, help="Number of entries to show (default: 20).")
+    logs.add_argument("--date", help="Log date as YYYY-MM-DD (default: latest).")
+    logs.add_argument("--status", help="Only show entries with this status (e.g. error).")
+    logs.add_argument("--action", help="Only show entries with this action.")
+    logs.set_defaults(func=cmd_logs)
+
+    daemon = subparsers.add_parser("daemon", help="Run the background daemon that keeps clients warm.")
+    daemon.add_argument("--stop", action="store_true", help="Stop a running daemon.")
+    daemon.set_defaults(func=cmd_daemon)
+    subparsers.add_parser("status", help="Show daemon state or per-status row counts (works offline).").set_defaults(func=cmd_status)
+
+    preflight = subparsers.add_parser("preflight", help="Check config, Google, Sheet, YouTube key and JD in parallel.")
+    preflight.add_argument("--timeout", type=float, default=8, help="Seconds per check (default: 8).")
+    preflight.add_argument("--deadline", type=float, default=10, help="Seconds for the whole check (default: 10).")
+    preflight.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    preflight.set_defaults(func=cmd_preflight)
+
+    startup = subparsers.add_parser("startup-check", help="Fail if cold startup exceeds the import-time budget.")
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Budget in seconds.")
+    startup.set_defaults(func=cmd_startup_check)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        from utils import profiler
+        profiler.enable()
+        return profiler.profiled(args.func, name=args.command)(args) or 0
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
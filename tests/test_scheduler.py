@@ -0,0 +1,100 @@
+"""DownloadScheduler against the simulated device: in-flight cap, bandwidth cap, urgent preemption."""
+from downloader.jd_scheduler import DownloadScheduler, URGENT, NORMAL
+from utils.jd_simulator import FakeClock, FakeDevice, MB, simulate
+
+
+def make_scheduler(jobs, max_in_flight=3, max_bandwidth_mbps=0, bandwidth_mbps=20, package_speed_mbps=8):
+    clock = FakeClock()
+    device = FakeDevice(clock=clock, bandwidth=bandwidth_mbps * MB, package_speed=package_speed_mbps * MB)
+    cfg = {"download_dir": device.save_to, "max_in_flight": max_in_flight, "max_bandwidth_mbps": max_bandwidth_mbps}
+    events = []
+    scheduler = DownloadScheduler(cfg, device, clock=clock, log=lambda message, **fields: events.append(fields))
+    for n in range(jobs):
+        scheduler.push(job(n))
+    return scheduler, device, events
+
+
+def job(n, priority=NORMAL, package=None):
+    return {"row": n + 2, "url": f"https://youtu.be/fake{n:07}", "package": package or f"job_{n:03}",
+            "priority": priority, "deadline": None}
+
+
+def running(device):
+    return [p for p in device.packages.values() if p["enabled"] and not p["finished"]]
+
+
+def test_in_flight_cap():
+    scheduler, device, _ = make_scheduler(jobs=10, max_in_flight=3)
+    peak = 0
+    while not scheduler.idle():
+        scheduler.step()
+        assert len(scheduler.in_flight) <= 3
+        assert len(running(device)) <= 3
+        peak = max(peak, len(scheduler.in_flight))
+        device.advance(15)
+    assert peak == 3
+    assert len(scheduler.done) == 10
+
+
+def test_bandwidth_cap_releases_gradually():
+    scheduler, device, _ = make_scheduler(jobs=10, max_in_flight=10, max_bandwidth_mbps=10, package_speed_mbps=4)
+    scheduler.step()
+    assert len(scheduler.in_flight) == 1  # nothing measured yet: one package may fill the cap
+    while not scheduler.idle():
+        device.advance(15)
+        scheduler.step()
+        actual = sum(p["speed"] for p in running(device))
+        # Releases stop once the measured rate reaches the cap, so it is overshot by less than one package.
+        assert actual < 10 * MB + 4 * MB
+        assert len(scheduler.in_flight) <= 3
+
+
+def test_without_bandwidth_cap_fills_in_flight():
+    scheduler, _, _ = make_scheduler(jobs=10, max_in_flight=5)
+    scheduler.step()
+    assert len(scheduler.in_flight) == 5
+
+
+def test_urgent_job_preempts_lowest_priority():
+    scheduler, device, events = make_scheduler(jobs=4, max_in_flight=2)
+    scheduler.push(job(10, priority=3, package="low"))
+    scheduler.step()
+    device.advance(5)
+    scheduler.step()
+    assert set(scheduler.in_flight) == {"job_000", "job_001"}
+
+    scheduler.push(job(11, priority=URGENT, package="urgent"))
+    scheduler.step()
+    assert "urgent" in scheduler.in_flight
+    assert len(scheduler.in_flight) == 2
+    assert scheduler.preempted == 1
+    parked = [p for p in device.packages.values() if not p["enabled"]]
+    assert len(parked) == 1 and parked[0]["name"] in ("job_000", "job_001")
+    assert events and events[0]["action"] == "download_preempted"
+
+    while not scheduler.idle():
+        device.advance(15)
+        scheduler.step()
+    assert len(scheduler.done) == 6  # the parked package was resumed and finished
+
+
+def test_simulate_urgent_finishes_quickly():
+    stats = simulate(jobs=20, urgent_at=120, max_in_flight=3)
+    assert stats["done"] == 21
+    assert stats["preempted"] >= 1
+    assert stats["urgent_wait"] is not None and stats["urgent_wait"] <= 120
+
+
+def test_urgent_row_seen_within_refill_interval():
+    scheduler, device, _ = make_scheduler(jobs=3, max_in_flight=1)
+    assert scheduler.refill_interval == 30
+    scheduler.refill_interval = 15
+    calls = []
+
+    def refill():
+        calls.append(scheduler.clock())
+        return [job(20, priority=URGENT, package="urgent")] if len(calls) == 1 else []
+
+    scheduler.run(interval=15, refill=refill, sleep=device.advance)
+    assert calls[0] == 15  # an urgent row is seen after one refill interval, not minutes later
+    assert "urgent" in scheduler.done
@@ -0,0 +1,14 @@
+"""Cold startup of the stalkr CLI must stay lazy and within budget."""
+import stalkr
+
+
+def test_cold_startup_within_budget():
+    elapsed, heavy = stalkr.measure_cold_startup()
+    assert elapsed <= stalkr.STARTUP_BUDGET_SECONDS, (
+        f"cold startup took {elapsed * 1000:.1f} ms (budget {stalkr.STARTUP_BUDGET_SECONDS * 1000:.0f} ms)"
+    )
+
+
+def test_cold_startup_imports_no_heavy_modules():
+    _, heavy = stalkr.measure_cold_startup()
+    assert heavy == [], f"heavy modules imported at startup: {', '.join(heavy)}"
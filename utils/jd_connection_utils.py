@@ -3,7 +3,6 @@ import subprocess
 import json
 import time
 import platform
-import myjdapi
 
 def detect_os():
     plat = platform.system().lower()
@@ -84,6 +83,7 @@ def check_jd_api_connection(cfg, org_secrets_path):
         return False, None
     with open(org_secrets_path, "r") as f:
         secrets = json.load(f)
+    import myjdapi  # imported here so config-only callers skip the myjdapi import cost
     try:
         jd = myjdapi.Myjdapi()
         jd.connect(secrets["myjd_email"], secrets["myjd_password"])
@@ -99,6 +99,34 @@ def check_jd_api_connection(cfg, org_secrets_path):
         print(f"❌ MyJDownloader connection failed: {e}")
         return False, None
 
+def connect_org_devices(cfg, org_secrets_path):
+    """Connect to MyJDownloader and return every device registered in the org account.
+
+    The researcher's own device (cfg["device"]) comes first. Returns [] on failure.
+    """
+    if not os.path.exists(org_secrets_path):
+        print(f"❌ org_secrets.json not found at {org_secrets_path}")
+        return []
+    with open(org_secrets_path, "r") as f:
+        secrets = json.load(f)
+    import myjdapi
+    try:
+        jd = myjdapi.Myjdapi()
+        jd.connect(secrets["myjd_email"], secrets["myjd_password"])
+        jd.update_devices()
+        devices = []
+        for info in jd.list_devices():
+            try:
+                devices.append(jd.get_device(device_id=info["id"]))
+            except Exception as e:
+                print(f"⚠️ Skipping device '{info.get('name')}': {e}")
+    except Exception as e:
+        print(f"❌ MyJDownloader connection failed: {e}")
+        return []
+    devices.sort(key=lambda d: d.name != cfg.get("device"))
+    print(f"✅ Found {len(devices)} MyJDownloader device(s): {', '.join(d.name for d in devices)}")
+    return devices
+
 def ensure_jd_running_and_connected(cfg, user_config_path, org_secrets_path):
     # Check JD app path in config or prompt
     if not cfg.get("jd_app_path"):
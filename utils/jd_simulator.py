@@ -0,0 +1,152 @@
+"""In-memory stand-in for a myjdapi device, with simulated download speeds.
+
+FakeDevice implements the calls stalkr makes (linkgrabber.add_links,
+downloads.query_packages / set_enabled / force_download) on top of a FakeClock.
+advance() moves time forward and splits the link bandwidth evenly across enabled,
+unfinished packages, each capped at its own per-package speed. simulate() runs the
+DownloadScheduler against it so scheduling changes can be checked without JD, both by
+tests/test_scheduler.py and by hand:
+
+    python stalkr.py simulate --jobs 20 --urgent-at 120
+
+Nothing here talks to JD, the Sheet or logs/; only the simulate command and the tests import it.
+"""
+import itertools
+import random
+
+MB = 1024 * 1024
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class _FakeLinkgrabber:
+    def __init__(self, device):
+        self.device = device
+
+    def add_links(self, params):
+        for link in params:
+            self.device.add_package(link["packageName"], link["links"], link.get("autostart", False))
+        return {"id": next(self.device._ids)}
+
+class _FakeDownloads:
+    def __init__(self, device):
+        self.device = device
+
+    def query_packages(self, params=None):
+        return [
+            {
+                "uuid": p["uuid"],
+                "name": p["name"],
+                "bytesLoaded": int(p["bytesLoaded"]),
+                "bytesTotal": p["bytesTotal"],
+                "finished": p["finished"],
+                "running": p["enabled"] and not p["finished"],
+                "speed": int(p["speed"]),
+                "status": "Finished" if p["finished"] else ("Running" if p["enabled"] else "Disabled"),
+                "saveTo": self.device.save_to
+            }
+            for p in self.device.packages.values()
+        ]
+
+    def set_enabled(self, enable, link_ids, package_ids):
+        for uuid in package_ids:
+            self.device.packages[uuid]["enabled"] = enable
+
+    def force_download(self, link_ids=[], package_ids=[]):
+        self.set_enabled(True, link_ids, package_ids)
+
+class FakeDevice:
+    """A JD device whose packages download at simulated speeds as the clock advances.
+
+    `bandwidth` is the device's link in bytes/s, `package_speed` the per-package ceiling,
+    and `sizes` a callable returning each new package's size in bytes.
+    """
+
+    def __init__(self, name="fake", clock=None, bandwidth=20 * MB, package_speed=8 * MB,
+                 sizes=None, save_to="/tmp/stalkr-fake"):
+        self.name = name
+        self.device_id = name
+        self.clock = clock or FakeClock()
+        self.bandwidth = bandwidth
+        self.package_speed = package_speed
+        self.sizes = sizes or (lambda: 300 * MB)
+        self.save_to = save_to
+        self.packages = {}  # uuid -> package dict, in insertion order
+        self.finished_at = {}  # package name -> clock time
+        self._ids = itertools.count(1)
+        self.linkgrabber = _FakeLinkgrabber(self)
+        self.downloads = _FakeDownloads(self)
+
+    def add_package(self, name, links, autostart=True):
+        uuid = next(self._ids)
+        self.packages[uuid] = {
+            "uuid": uuid,
+            "name": name,
+            "links": links,
+            "bytesLoaded": 0.0,
+            "bytesTotal": self.sizes(),
+            "finished": False,
+            "enabled": autostart,
+            "speed": 0.0
+        }
+        return uuid
+
+    def advance(self, seconds, step=1.0):
+        """Move the clock forward `seconds`, downloading in `step`-second slices."""
+        remaining = seconds
+        while remaining > 0:
+            dt = min(step, remaining)
+            active = [p for p in self.packages.values() if p["enabled"] and not p["finished"]]
+            share = min(self.package_speed, self.bandwidth / len(active)) if active else 0
+            for p in self.packages.values():
+                p["speed"] = share if p in active else 0.0
+            self.clock.now += dt
+            for p in active:
+                p["bytesLoaded"] = min(p["bytesLoaded"] + share * dt, p["bytesTotal"])
+                if p["bytesLoaded"] >= p["bytesTotal"]:
+                    p["finished"] = True
+                    p["speed"] = 0.0
+                    self.finished_at[p["name"]] = self.clock.now
+            remaining -= dt
+
+def simulate(jobs=20, urgent_at=120, max_in_flight=3, max_bandwidth_mbps=0, interval=15,
+             bandwidth_mbps=20, package_speed_mbps=8, seed=0):
+    """Run the scheduler against a FakeDevice; one urgent job is added at `urgent_at` seconds.
+
+    Returns the scheduler stats plus how long the urgent job took from being added to finishing.
+    Scheduler events are printed only, never written to the real log.
+    """
+    from downloader.jd_scheduler import DownloadScheduler, URGENT, NORMAL
+    rng = random.Random(seed)
+    clock = FakeClock()
+    device = FakeDevice(
+        clock=clock,
+        bandwidth=bandwidth_mbps * MB,
+        package_speed=package_speed_mbps * MB,
+        sizes=lambda: rng.randint(100, 800) * MB
+    )
+    cfg = {"download_dir": device.save_to, "max_in_flight": max_in_flight, "max_bandwidth_mbps": max_bandwidth_mbps}
+    scheduler = DownloadScheduler(cfg, device, clock=clock, log=lambda message, **fields: print(message))
+    for n in range(jobs):
+        scheduler.push({"row": n + 2, "url": f"https://youtu.be/fake{n:07}", "package": f"job_{n:03}",
+                        "priority": NORMAL, "deadline": None})
+
+    pending_urgent = True
+
+    def refill():
+        nonlocal pending_urgent
+        if pending_urgent and clock() >= urgent_at:
+            pending_urgent = False
+            return [{"row": jobs + 2, "url": "https://youtu.be/urgent0000", "package": "urgent",
+                     "priority": URGENT, "deadline": None}]
+        return []
+
+    stats = scheduler.run(interval=interval, refill=refill, refill_interval=0, sleep=device.advance)
+    urgent_done = device.finished_at.get("urgent")
+    stats["elapsed"] = clock()
+    stats["urgent_wait"] = urgent_done - urgent_at if urgent_done is not None else None
+    return stats
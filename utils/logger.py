@@ -81,6 +81,10 @@ def logprint(message, action, status="info", error_message=None, sheet_row=None,
 
 def log_script(func):
     import os
+    import sys
+    from utils.profiler import enable, profiled
+    if "--profile" in sys.argv[1:]:
+        enable()  # `python <script>.py --profile`
     def wrapper(*args, **kwargs):
         script = os.path.basename(__file__)
         log_event(script=script, action="script_start", status="info")
@@ -92,4 +96,5 @@ def log_script(func):
             log_event(script=script, action="fatal_error", status="error", error_message=str(e))
             print(f"❌ Fatal error: {e}")
             raise
-    return wrapper
+    # --profile / STALKR_PROFILE=1 runs the script under utils.profiler
+    return profiled(wrapper, name=os.path.splitext(os.path.basename(func.__code__.co_filename))[0])
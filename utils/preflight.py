@@ -0,0 +1,165 @@
+"""Non-interactive pre-flight check (the "Connect" step).
+
+Checks the user config, Google credentials, Sheet access, the YouTube API key,
+MyJDownloader login and device presence concurrently, each with its own timeout
+and all under one overall deadline, so the whole check takes about as long as
+the slowest single call. Nothing prompts, launches JD or sleeps.
+
+run_preflight() returns one dict per check:
+    {"name": ..., "ok": bool, "latency_ms": float | None, "error": str | None, "detail": str | None}
+A check still running at its timeout or the deadline is reported as timed out.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_CONFIG_PATH = os.path.join(BASE_DIR, "config", "user_config.json")
+ORG_SECRETS_PATH = os.path.join(BASE_DIR, "config", "org_secrets.json")
+SERVICE_ACCOUNT_PATH = os.path.join(BASE_DIR, "private", "stalkrorgsheetapi-4feb1ec20bbe.json")
+
+CHECK_TIMEOUT = 8  # seconds per check
+DEADLINE = 10  # seconds for the whole pre-flight
+REQUIRED_FIELDS = ["initials", "device", "download_dir", "sheet_url", "last_tab"]
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+YOUTUBE_PROBE_ID = "jNQXAC9IVRw"  # "Me at the zoo": public since 2005
+
+def _read_json(path, label):
+    if not os.path.exists(path):
+        raise RuntimeError(f"{label} not found at {path}")
+    with open(path, "r") as f:
+        return json.load(f)
+
+# --- Checks: each returns (detail, value for dependent checks) or raises ---
+
+def check_config(ctx):
+    cfg = _read_json(USER_CONFIG_PATH, "user_config.json")
+    missing = [field for field in REQUIRED_FIELDS if not cfg.get(field)]
+    if missing:
+        raise RuntimeError(f"missing {', '.join(missing)} (run `stalkr.py setup`)")
+    return f"initials {cfg['initials']}, device {cfg['device']}", cfg
+
+def check_google_credentials(ctx):
+    from sheet.sheet_cache import authorize
+    client = authorize(SERVICE_ACCOUNT_PATH, SCOPES)
+    client.set_timeout(ctx["timeout"])
+    return client.http_client.auth.service_account_email, client
+
+def check_sheet_access(ctx):
+    from sheet.sheet_cache import fetch_sheet_metadata
+    cfg = ctx["config"].result(timeout=ctx["timeout"])
+    client = ctx["google_credentials"].result(timeout=ctx["timeout"])
+    entry = fetch_sheet_metadata(client, cfg["sheet_url"])
+    if cfg["last_tab"] not in entry["worksheets"]:
+        raise RuntimeError(f"tab '{cfg['last_tab']}' not found")
+    return f"{entry['spreadsheet'].get('title')} / {cfg['last_tab']}", None
+
+def check_youtube_key(ctx):
+    import requests
+    secrets = ctx["secrets"]
+    if not secrets.get("youtube_api_key"):
+        raise RuntimeError("no youtube_api_key in org_secrets.json")
+    response = requests.get(
+        "https://www.googleapis.com/youtube/v3/videos",
+        params={"part": "id", "id": YOUTUBE_PROBE_ID, "key": secrets["youtube_api_key"]},
+        timeout=ctx["timeout"]
+    )
+    if response.status_code != 200:
+        try:
+            reason = response.json()["error"]["message"]
+        except Exception:
+            reason = response.text[:200]
+        raise RuntimeError(f"HTTP {response.status_code}: {reason}")
+    return "key accepted", None
+
+def check_myjd_login(ctx):
+    import myjdapi
+    secrets = ctx["secrets"]
+    jd = myjdapi.Myjdapi()
+    jd.connect(secrets["myjd_email"], secrets["myjd_password"])
+    jd.update_devices()
+    return secrets["myjd_email"], jd
+
+def check_device(ctx):
+    cfg = ctx["config"].result(timeout=ctx["timeout"])
+    jd = ctx["myjd_login"].result(timeout=ctx["timeout"])
+    names = [d["name"] for d in jd.list_devices()]
+    if cfg["device"] not in names:
+        raise RuntimeError(f"'{cfg['device']}' not online (found: {', '.join(names) or 'none'})")
+    return f"{cfg['device']} online ({len(names)} device(s) in the account)", None
+
+# Order is the report order; later checks may wait on earlier ones through ctx.
+CHECKS = [
+    ("config", check_config),
+    ("google_credentials", check_google_credentials),
+    ("sheet_access", check_sheet_access),
+    ("youtube_key", check_youtube_key),
+    ("myjd_login", check_myjd_login),
+    ("device", check_device),
+]
+
+def _start(name, func, ctx, results):
+    """Run one check on a daemon thread; ctx[name] resolves to the value it hands to dependent checks."""
+    future = ctx[name]
+
+    def run():
+        started = time.perf_counter()
+        try:
+            detail, value = func(ctx)
+            result = {"ok": True, "detail": detail, "error": None}
+        except Exception as e:
+            value, result = None, {"ok": False, "detail": None, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        results[name] = result
+        if result["ok"]:
+            future.set_result(value)
+        else:
+            future.set_exception(RuntimeError(f"{name} failed"))
+
+    # Daemon threads: a call that hangs past the deadline must not keep the process alive.
+    threading.Thread(target=run, name=f"preflight-{name}", daemon=True).start()
+
+def run_preflight(check_timeout=CHECK_TIMEOUT, deadline=DEADLINE, checks=None):
+    """Run the checks concurrently and return their results in CHECKS order."""
+    checks = checks or CHECKS
+    try:
+        secrets = _read_json(ORG_SECRETS_PATH, "org_secrets.json")
+    except Exception as e:
+        secrets = {}
+        secrets_error = str(e)
+    else:
+        secrets_error = None
+    ctx = {"timeout": check_timeout, "secrets": secrets}
+    ctx.update({name: Future() for name, _ in checks})
+    results = {}
+    started = time.monotonic()
+    for name, func in checks:
+        if secrets_error and name in ("youtube_key", "myjd_login"):
+            results[name] = {"ok": False, "detail": None, "error": secrets_error, "latency_ms": 0.0}
+            ctx[name].set_exception(RuntimeError(secrets_error))
+            continue
+        _start(name, func, ctx, results)
+
+    report = []
+    for name, _ in checks:
+        remaining = min(check_timeout, deadline) - (time.monotonic() - started)
+        try:
+            ctx[name].exception(timeout=max(remaining, 0))
+        except FutureTimeout:
+            pass
+        result = results.get(name)
+        if result is None:
+            limit = "deadline" if deadline < check_timeout else "timeout"
+            result = {"ok": False, "detail": None, "error": f"timed out ({limit})", "latency_ms": None}
+        report.append(dict(result, name=name))
+    return report
+
+def print_preflight(report):
+    for result in report:
+        latency = f"{result['latency_ms']:.0f} ms" if result["latency_ms"] is not None else "—"
+        if result["ok"]:
+            print(f"✅ {result['name']:<20} {latency:>8}  {result['detail'] or ''}")
+        else:
+            print(f"❌ {result['name']:<20} {latency:>8}  {result['error']}")
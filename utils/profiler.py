@@ -0,0 +1,244 @@
+"""Opt-in profiling for stalkr entry points.
+
+Enabled with `python stalkr.py --profile <command>`, `python <script>.py --profile`
+or STALKR_PROFILE=1. Every function wrapped by log_script (or @profiled) then writes
+to logs/profiles/:
+
+    <stamp>_<name>.pstats      cProfile dump (python -m pstats, snakeviz, ...), covering the
+                               calling thread and every thread started during the run
+                               (pipeline stages, the write buffer flusher, daemon handlers)
+    <stamp>_<name>.collapsed   sampled stacks, one "frame;frame;frame count" per line
+                               (flamegraph.pl, speedscope, inferno)
+    <stamp>_<name>.latency.json  wall-clock latency histogram per external API call type
+
+When disabled nothing is patched or started; the only cost is one flag check per run.
+"""
+import os
+import sys
+import json
+import time
+import datetime
+import functools
+import threading
+from collections import Counter
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+PROFILES_DIR = os.path.join(LOGS_DIR, "profiles")
+ENV_FLAG = "STALKR_PROFILE"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_active = threading.local()
+
+def enable():
+    os.environ[ENV_FLAG] = "1"
+
+def is_enabled():
+    return os.environ.get(ENV_FLAG, "") not in ("", "0")
+
+# --- API call latency ---
+
+def call_type(method, url):
+    """Group a request URL into a stable call type, e.g. 'sheets values:batchGet' or 'myjd downloadsV2/queryPackages'."""
+    from urllib.parse import urlsplit
+    parts = urlsplit(url)
+    path = [p for p in parts.path.split("/") if p]
+    host = parts.netloc
+    if host == "sheets.googleapis.com":
+        # /v4/spreadsheets/<id>/values/<range>:batchGet -> values:batchGet
+        rest = path[3:] if len(path) > 3 else []
+        if rest and rest[0] == "values":
+            op = "values" + (":" + rest[-1].rsplit(":", 1)[1] if ":" in rest[-1] else "")
+        elif path and ":" in path[-1]:
+            op = path[-1].rsplit(":", 1)[1]
+        else:
+            op = "metadata"
+        return f"sheets {method} {op}"
+    if host == "www.googleapis.com" and "youtube" in path:
+        return f"youtube {path[-1]}"
+    if host == "www.googleapis.com" and "drive" in path:
+        return f"drive {method} files"
+    if host in ("oauth2.googleapis.com", "accounts.google.com"):
+        return "google token"
+    if "jdownloader" in host or host.startswith("192.168.") or host.startswith("127.0.0.1"):
+        # /t_<session>_<device>/downloadsV2/queryPackages -> downloadsV2/queryPackages
+        action = [p for p in path if not p.startswith("t_")]
+        return "myjd " + "/".join(action[-2:])
+    return f"http {method} {host}"
+
+class LatencyRecorder:
+    """Wraps requests.Session.request to time every HTTP call by call type."""
+
+    def __init__(self):
+        self.samples = {}  # call type -> [seconds]
+        self._lock = threading.Lock()
+        self._original = None
+
+    def install(self):
+        import requests
+        self._original = requests.Session.request
+        original = self._original
+        recorder = self
+
+        @functools.wraps(original)
+        def timed_request(session, method, url, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(session, method, url, *args, **kwargs)
+            finally:
+                recorder.record(call_type(str(method).upper(), str(url)), time.perf_counter() - start)
+
+        requests.Session.request = timed_request
+
+    def uninstall(self):
+        if self._original is not None:
+            import requests
+            requests.Session.request = self._original
+            self._original = None
+
+    def record(self, kind, seconds):
+        with self._lock:
+            self.samples.setdefault(kind, []).append(seconds)
+
+    def summary(self):
+        result = {}
+        for kind, samples in sorted(self.samples.items()):
+            ms = sorted(s * 1000 for s in samples)
+            buckets = {f"<={bound}ms": 0 for bound in LATENCY_BUCKETS_MS}
+            buckets[f">{LATENCY_BUCKETS_MS[-1]}ms"] = 0
+            for value in ms:
+                bound = next((b for b in LATENCY_BUCKETS_MS if value <= b), None)
+                buckets[f"<={bound}ms" if bound is not None else f">{LATENCY_BUCKETS_MS[-1]}ms"] += 1
+            result[kind] = {
+                "count": len(ms),
+                "total_ms": round(sum(ms), 1),
+                "p50_ms": round(ms[len(ms) // 2], 1),
+                "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 1),
+                "max_ms": round(ms[-1], 1),
+                "histogram": buckets
+            }
+        return result
+
+# --- Per-thread cProfile ---
+
+class ThreadProfiles:
+    """Starts a cProfile.Profile in every thread created while installed, for merging at the end.
+
+    cProfile only records the thread that enabled it. On Python 3.12+ a single profile already
+    sees every thread and a second one cannot be enabled, so nothing is added there.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def _start(self, frame, event, arg):
+        import cProfile
+        sys.setprofile(None)  # runs once per thread, as the thread starts
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return
+        with self._lock:
+            self.profiles.append(profile)
+
+    def install(self):
+        threading.setprofile(self._start)
+
+    def uninstall(self):
+        threading.setprofile(None)
+
+    def merge_into(self, stats):
+        """Add every thread's profile to a pstats.Stats (call after the main profile is disabled)."""
+        with self._lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            stats.add(profile)
+        return len(profiles)
+
+# --- Stack sampling ---
+
+class StackSampler(threading.Thread):
+    """Samples every thread's stack and counts identical stacks (collapsed-stack format)."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stalkr-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+# --- Session ---
+
+def run_profiled(name, func, *args, **kwargs):
+    """Run func under cProfile, the stack sampler and the latency recorder, then write the profile files."""
+    import cProfile
+    import pstats
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    base = os.path.join(PROFILES_DIR, f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}_{name}")
+    profile = cProfile.Profile()
+    threads = ThreadProfiles()
+    sampler = StackSampler()
+    latency = LatencyRecorder()
+    _active.running = True
+    latency.install()
+    sampler.start()
+    threads.install()
+    started = time.perf_counter()
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        elapsed = time.perf_counter() - started
+        threads.uninstall()
+        sampler.stop()
+        latency.uninstall()
+        _active.running = False
+        stats = pstats.Stats(profile)
+        threads.merge_into(stats)
+        stats.dump_stats(f"{base}.pstats")
+        sampler.write(f"{base}.collapsed")
+        summary = latency.summary()
+        with open(f"{base}.latency.json", "w", encoding="utf-8") as f:
+            json.dump({"wall_s": round(elapsed, 3), "calls": summary}, f, indent=2)
+        print(f"\n⏱️ Profile ({elapsed:.2f}s) written to {base}.{{pstats,collapsed,latency.json}}")
+        for kind, stats in sorted(summary.items(), key=lambda kv: -kv[1]["total_ms"]):
+            print(f"   {kind}: {stats['count']} call(s), p50 {stats['p50_ms']}ms, p95 {stats['p95_ms']}ms, total {stats['total_ms']}ms")
+
+def profiled(func, name=None):
+    """Run func under run_profiled when profiling is enabled (outermost call only)."""
+    name = name or os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_enabled() or getattr(_active, "running", False):
+            return func(*args, **kwargs)
+        return run_profiled(name, func, *args, **kwargs)
+    return wrapper